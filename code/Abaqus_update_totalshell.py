@@ -10,16 +10,30 @@ from abaqus import *
 from abaqusConstants import *
 from caeModules import *
 from driverUtils import executeOnCaeStartup
+import glob
 import os
+import shutil
+import sys
+import multiprocessing
+import subprocess
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# Runs under "abaqus cae noGUI=..." (e.g. parameter sweeps) skip all viewport
+# updates and the contour image; only the numeric results are written
+HEADLESS = any('noGUI' in arg for arg in sys.argv)
 
 # Initialize viewport
-session.Viewport(name='Viewport: 1', origin=(0.0, 0.0), 
-                 width=92.94, height=126.41)
-session.viewports['Viewport: 1'].makeCurrent()
-session.viewports['Viewport: 1'].maximize()
 executeOnCaeStartup()
-session.viewports['Viewport: 1'].partDisplay.geometryOptions.setValues(
-    referenceRepresentation=ON)
+if not HEADLESS:
+    session.Viewport(name='Viewport: 1', origin=(0.0, 0.0), 
+                     width=92.94, height=126.41)
+    session.viewports['Viewport: 1'].makeCurrent()
+    session.viewports['Viewport: 1'].maximize()
+    session.viewports['Viewport: 1'].partDisplay.geometryOptions.setValues(
+        referenceRepresentation=ON)
 
 # =============================================================================
 # PARAMETERS DEFINITION
@@ -54,280 +68,503 @@ u3u = 0.0     # Displacement in Z
 trueu3 = 10.0 # True displacement in Z
 nodedeform = 6.0 # Node deformation limit
 
-# Generate print name for file identification
-printname = (f'A{A}B{B}C{C}D{D}L{L}E{E}F{F}BoltD{BoltD}BoltB{BoltB}'
-             f'sfricn{sfricn}pbol{pbol}yfss{yfss}yuss{yuss}yusn{yusn}'
-             f'meshsz{meshsz}cf1f{cf1f}cf2f{cf2f}cf3f{cf3f}'
-             f'nodedeform{nodedeform}')
+# Extra load cases (cf1f, cf2f, cf3f) solved for every parameter set after
+# the set's own cf1f/cf2f/cf3f. Only the *Cload magnitudes differ between
+# cases, so the model is built and meshed once per set and the written input
+# deck is re-used for every entry. All cases must load the same X/Y directions
+# as the set itself (the freed DOFs are baked into the deck).
+EXTRA_LOAD_CASES = []
+
+JOB_NAME = 'BucklingAnalysis'
+NUM_CPUS = multiprocessing.cpu_count()  # Threads for the Lanczos solve
+MAX_CONCURRENT_JOBS = 2  # Simultaneous solves (bounded by solver license tokens)
+CPUS_PER_JOB = max(1, NUM_CPUS // MAX_CONCURRENT_JOBS)
+POLL_INTERVAL = 5        # Seconds between job status checks
+
+# Optional RAM disk (e.g. /dev/shm, or a Windows RamDisk such as R:\scratch)
+# for the case solves: decks, scratch files and ODBs stay there while the job
+# runs and is post-processed, then the job files are moved to working_dir
+RAMDISK_DIR = os.environ.get('ABAQUS_RAMDISK', '')
+
+# Immutable (hashable) record of the parameters that identify a case
+Params = namedtuple('Params', ['A', 'B', 'C', 'D', 'L', 'E', 'F', 'BoltD',
+    'BoltB', 'sfricn', 'pbol', 'yfss', 'yuss', 'yusn', 'meshsz', 'cf1f',
+    'cf2f', 'cf3f', 'nodedeform'])
+params = Params(A, B, C, D, L, E, F, BoltD, BoltB, sfricn, pbol, yfss, yuss,
+                yusn, meshsz, cf1f, cf2f, cf3f, nodedeform)
+
+# The same fields as a NumPy structured record, handed to the array
+# post-processing helpers as one argument instead of loose scalars
+PARAM_DTYPE = np.dtype([('A', 'i4'), ('B', 'i4'), ('C', 'i4'), ('D', 'i4'),
+    ('L', 'i4'), ('E', 'i4'), ('F', 'i4'), ('BoltD', 'i4'), ('BoltB', 'f8'),
+    ('sfricn', 'f8'), ('pbol', 'f8'), ('yfss', 'f8'), ('yuss', 'f8'),
+    ('yusn', 'f8'), ('meshsz', 'i4'), ('cf1f', 'f8'), ('cf2f', 'f8'),
+    ('cf3f', 'f8'), ('nodedeform', 'f8')])
+
+def param_record(p):
+    """Pack a Params tuple into a read-only structured NumPy scalar"""
+    arr = np.array([tuple(p)], dtype=PARAM_DTYPE)
+    arr.flags.writeable = False
+    return arr[0]
+
+# Geometry/material sets solved one after another in this CAE session (each in
+# its own model), so CAE startup is paid once per sweep. A driver script can
+# also import this module and call run() for its own sets.
+PARAM_SETS = [params]
+
+_NAME_TEMPLATE = ('A%(A)sB%(B)sC%(C)sD%(D)sL%(L)sE%(E)sF%(F)s'
+                  'BoltD%(BoltD)sBoltB%(BoltB)ssfricn%(sfricn)spbol%(pbol)s'
+                  'yfss%(yfss)syuss%(yuss)syusn%(yusn)smeshsz%(meshsz)s'
+                  'cf1f%(cf1f)scf2f%(cf2f)scf3f%(cf3f)snodedeform%(nodedeform)s')
+_name_cache = {}
+
+def _name(p):
+    """Generate print name for file identification (cached per Params)"""
+    if p not in _name_cache:
+        _name_cache[p] = _NAME_TEMPLATE % p._asdict()
+    return _name_cache[p]
 
 # Set working directory
 working_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 
                           'analysis_results')
-os.makedirs(working_dir, exist_ok=True)
+if not os.path.isdir(working_dir):
+    os.makedirs(working_dir)
 os.chdir(working_dir)
 
-# =============================================================================
-# GEOMETRY CREATION
-# =============================================================================
-session.viewports['Viewport: 1'].setValues(displayedObject=None)
-
-# Create base sketch
-s = mdb.models['Model-1'].ConstrainedSketch(name='__profile__', sheetSize=200.0)
-g, v, d, c = s.geometry, s.vertices, s.dimensions, s.constraints
-s.setPrimaryObject(option=STANDALONE)
-
-# Sketch geometry definition
-s.Line(point1=(0.0, 0), point2=(B/2, 0))
-s.HorizontalConstraint(entity=g[2], addUndoState=False)
-s.Line(point1=(0.0, 0), point2=(-B/2, 0))
-s.HorizontalConstraint(entity=g[3], addUndoState=False)
-s.ParallelConstraint(entity1=g[2], entity2=g[3], addUndoState=False)
-s.Line(point1=(0.0, 0), point2=(0.0, A))
-s.VerticalConstraint(entity=g[4], addUndoState=False)
-s.PerpendicularConstraint(entity1=g[2], entity2=g[4], addUndoState=False)
-s.Line(point1=(0.0, A), point2=(B/2, A))
-s.HorizontalConstraint(entity=g[5], addUndoState=False)
-s.PerpendicularConstraint(entity1=g[4], entity2=g[5], addUndoState=False)
-s.Line(point1=(0.0, A), point2=(-B/2, A))
-s.HorizontalConstraint(entity=g[6], addUndoState=False)
-s.PerpendicularConstraint(entity1=g[4], entity2=g[6], addUndoState=False)
-
-# Create 3D shell part
-p = mdb.models['Model-1'].Part(name='ShellPart', dimensionality=THREE_D,
-                              type=DEFORMABLE_BODY)
-p = mdb.models['Model-1'].parts['ShellPart']
-p.BaseShellExtrude(sketch=s, depth=L)
-s.unsetPrimaryObject()
-session.viewports['Viewport: 1'].setValues(displayedObject=p)
-del mdb.models['Model-1'].sketches['__profile__']
-
-# Pattern creation for multiple segments
-if E != 1:
-    p = mdb.models['Model-1'].parts['ShellPart']
-    s1 = p.features['Shell extrude-1'].sketch
-    mdb.models['Model-1'].ConstrainedSketch(name='__edit__', objectToCopy=s1)
-    s2 = mdb.models['Model-1'].sketches['__edit__']
-    g, v, d, c = s2.geometry, s2.vertices, s2.dimensions, s2.constraints
-    s2.setPrimaryObject(option=SUPERIMPOSE)
-    p.projectReferencesOntoSketch(sketch=s2,
-        upToFeature=p.features['Shell extrude-1'], filter=COPLANAR_EDGES)
-    
-    s2.linearPattern(geomList=(g[4], g[5], g[6]), vertexList=(),
-        number1=1, spacing1=20.0, angle1=0.0, number2=E, spacing2=A,
-        angle2=90.0)
-    s2.unsetPrimaryObject()
-    p = mdb.models['Model-1'].parts['ShellPart']
-    p.features['Shell extrude-1'].setValues(sketch=s2)
-    del mdb.models['Model-1'].sketches['__edit__']
-
-p = mdb.models['Model-1'].parts['ShellPart']
-p.regenerate()
-
-# =============================================================================
-# MATERIALS AND SECTIONS
-# =============================================================================
-session.viewports['Viewport: 1'].partDisplay.setValues(
-    sectionAssignments=ON, engineeringFeatures=ON)
-session.viewports['Viewport: 1'].partDisplay.geometryOptions.setValues(
-    referenceRepresentation=OFF)
-
-# Material definition
-mdb.models['Model-1'].Material(name='StructuralSteel')
-mdb.models['Model-1'].materials['StructuralSteel'].Elastic(
-    table=((205000.0, 0.3),))
-mdb.models['Model-1'].materials['StructuralSteel'].Density(table=((7.85e-09,),))
-
-# Section definitions
-mdb.models['Model-1'].HomogeneousShellSection(name='WebSection',
-    preIntegrate=OFF, material='StructuralSteel', thicknessType=UNIFORM,
-    thickness=C, thicknessField='', nodalThicknessField='',
-    idealization=NO_IDEALIZATION, poissonDefinition=DEFAULT,
-    thicknessModulus=None, temperature=GRADIENT, useDensity=OFF,
-    integrationRule=SIMPSON, numIntPts=5)
-
-mdb.models['Model-1'].HomogeneousShellSection(name='FlangeSection',
-    preIntegrate=OFF, material='StructuralSteel', thicknessType=UNIFORM,
-    thickness=D*2, thicknessField='', nodalThicknessField='',
-    idealization=NO_IDEALIZATION, poissonDefinition=DEFAULT,
-    thicknessModulus=None, temperature=GRADIENT, useDensity=OFF,
-    integrationRule=SIMPSON, numIntPts=5)
-
-mdb.models['Model-1'].HomogeneousShellSection(name='EdgeFlangeSection',
-    preIntegrate=OFF, material='StructuralSteel', thicknessType=UNIFORM,
-    thickness=D, thicknessField='', nodalThicknessField='',
-    idealization=NO_IDEALIZATION, poissonDefinition=DEFAULT,
-    thicknessModulus=None, temperature=GRADIENT, useDensity=OFF,
-    integrationRule=SIMPSON, numIntPts=5)
-
-# Section assignments (web sections)
-p = mdb.models['Model-1'].parts['ShellPart']
-f = p.faces
-
-# Web section assignment based on number of segments
-face_locations = []
-for i in range(1, E + 1):
-    if i == 1:
-        face_locations.append(((0.0, A/2, L/2),))
-    else:
-        face_locations.append(((0.0, A*i - A/2, L/2),))
-
-faces = f.findAt(*face_locations)
-region = regionToolset.Region(faces=faces)
-p.SectionAssignment(region=region, sectionName='WebSection', offset=0.0,
-    offsetType=MIDDLE_SURFACE, offsetField='',
-    thicknessAssignment=FROM_SECTION)
-
-# Flange section assignments (similar pattern as original code, but simplified)
-# ... [Section assignment code continues with similar structure] ...
+solve_dir = working_dir
+if RAMDISK_DIR:
+    solve_dir = os.path.join(RAMDISK_DIR, 'analysis_results')
+    if not os.path.isdir(solve_dir):
+        os.makedirs(solve_dir)
 
 # =============================================================================
-# ASSEMBLY AND BOUNDARY CONDITIONS
+# MODEL BUILD
 # =============================================================================
-a = mdb.models['Model-1'].rootAssembly
-session.viewports['Viewport: 1'].setValues(displayedObject=a)
-a.DatumCsysByDefault(CARTESIAN)
-p = mdb.models['Model-1'].parts['ShellPart']
-a.Instance(name='ShellPart-1', part=p, dependent=ON)
-
-# Analysis step
-session.viewports['Viewport: 1'].assemblyDisplay.setValues(
-    adaptiveMeshConstraints=ON)
-mdb.models['Model-1'].BuckleStep(name='BucklingAnalysis', previous='Initial',
-    numEigen=10, eigensolver=LANCZOS, minEigen=None, blockSize=DEFAULT,
-    maxBlocks=DEFAULT)
-session.viewports['Viewport: 1'].assemblyDisplay.setValues(step='BucklingAnalysis')
-
-# Create sets for boundary conditions
-a1 = mdb.models['Model-1'].rootAssembly
-
-# Top attachment point
-a1.AttachmentPoints(name='TopAttachment', points=((0, A*E/2, L),))
-verts1 = a1.vertices.findAt(((0, A*E/2, L),))
-a1.Set(vertices=verts1, name='TopPoint')
-
-# Bottom attachment point  
-a1.AttachmentPoints(name='BottomAttachment', points=((0, A*E/2, 0),))
-verts1 = a1.vertices.findAt(((0, A*E/2, 0),))
-a1.Set(vertices=verts1, name='BottomPoint')
-
-# Create surface sets for MPC constraints
-# ... [Surface set creation code] ...
-
-# Multipoint constraints
-a = mdb.models['Model-1'].rootAssembly
-region1 = a.sets['TopPoint']
-region2 = a.sets['TopSurface']
-mdb.models['Model-1'].MultipointConstraint(name='TopMPC',
-    controlPoint=region1, surface=region2, mpcType=BEAM_MPC,
-    userMode=DOF_MODE_MPC, userType=0, csys=None)
-
-region1 = a.sets['BottomPoint']
-region2 = a.sets['BottomSurface']
-mdb.models['Model-1'].MultipointConstraint(name='BottomMPC',
-    controlPoint=region1, surface=region2, mpcType=BEAM_MPC,
-    userMode=DOF_MODE_MPC, userType=0, csys=None)
-
-# Boundary conditions
-region = a1.sets['TopPoint']
-mdb.models['Model-1'].DisplacementBC(name='TopBC', createStepName='Initial',
-    region=region, u1=SET, u2=SET, u3=UNSET, ur1=SET, ur2=SET, ur3=SET,
-    amplitude=UNSET, distributionType=UNIFORM, fieldName='', localCsys=None)
-
-# Apply boundary conditions based on load factors
-if cf1f != 0:
-    mdb.models['Model-1'].boundaryConditions['TopBC'].setValuesInStep(
-        stepName='BucklingAnalysis', u1=FREED, buckleCase=PERTURBATION_AND_BUCKLING)
-if cf2f != 0:
-    mdb.models['Model-1'].boundaryConditions['TopBC'].setValuesInStep(
-        stepName='BucklingAnalysis', u2=FREED, buckleCase=PERTURBATION_AND_BUCKLING)
-
-# Bottom boundary condition
-region = a1.sets['BottomPoint']
-mdb.models['Model-1'].DisplacementBC(name='BottomBC', createStepName='Initial',
-    region=region, u1=SET, u2=SET, u3=SET, ur1=SET, ur2=SET, ur3=SET,
-    amplitude=UNSET, distributionType=UNIFORM, fieldName='', localCsys=None)
-
-# Load application
-region = a1.sets['TopPoint']
-mdb.models['Model-1'].ConcentratedForce(name='AppliedLoad', 
-    createStepName='BucklingAnalysis', region=region, cf1=cf1f, cf2=cf2f, 
-    cf3=cf3f, distributionType=UNIFORM, field='', localCsys=None)
+def build_model_once(params, model_name, job_name):
+    """Build, mesh and write the template input deck for all load cases"""
+    A, B, C, D, L, E = (params.A, params.B, params.C, params.D, params.L,
+                        params.E)
+    meshsz = params.meshsz
+    m = mdb.models[model_name]
+
+    # =========================================================================
+    # GEOMETRY CREATION
+    # =========================================================================
+    if not HEADLESS:
+        session.viewports['Viewport: 1'].setValues(displayedObject=None)
+
+    # Create base sketch
+    s = m.ConstrainedSketch(name='__profile__', sheetSize=200.0)
+    g, v, d, c = s.geometry, s.vertices, s.dimensions, s.constraints
+    s.setPrimaryObject(option=STANDALONE)
+
+    # Sketch geometry definition. The lines are drawn at their final
+    # coordinates and extruded straight away, so no constraints are added
+    # (each one would be another pass of the sketch constraint solver).
+    # Every segment adds its web and the flange on top of it, so all E
+    # segments are in the base sketch and no pattern edit is needed.
+    s.Line(point1=(0.0, 0), point2=(B/2, 0))
+    s.Line(point1=(0.0, 0), point2=(-B/2, 0))
+    for i in range(1, E + 1):
+        s.Line(point1=(0.0, A*(i - 1)), point2=(0.0, A*i))
+        s.Line(point1=(0.0, A*i), point2=(B/2, A*i))
+        s.Line(point1=(0.0, A*i), point2=(-B/2, A*i))
+
+    # Create 3D shell part
+    p = m.Part(name='ShellPart', dimensionality=THREE_D, type=DEFORMABLE_BODY)
+    p.BaseShellExtrude(sketch=s, depth=L)
+    s.unsetPrimaryObject()
+    if not HEADLESS:
+        session.viewports['Viewport: 1'].setValues(displayedObject=p)
+    del m.sketches['__profile__']
+
+    # =========================================================================
+    # MATERIALS AND SECTIONS
+    # =========================================================================
+    if not HEADLESS:
+        session.viewports['Viewport: 1'].partDisplay.setValues(
+            sectionAssignments=ON, engineeringFeatures=ON)
+        session.viewports['Viewport: 1'].partDisplay.geometryOptions.setValues(
+            referenceRepresentation=OFF)
+
+    # Material definition
+    m.Material(name='StructuralSteel')
+    m.materials['StructuralSteel'].Elastic(table=((205000.0, 0.3),))
+    m.materials['StructuralSteel'].Density(table=((7.85e-09,),))
+
+    # Section definitions
+    m.HomogeneousShellSection(name='WebSection',
+        preIntegrate=OFF, material='StructuralSteel', thicknessType=UNIFORM,
+        thickness=C, thicknessField='', nodalThicknessField='',
+        idealization=NO_IDEALIZATION, poissonDefinition=DEFAULT,
+        thicknessModulus=None, temperature=GRADIENT, useDensity=OFF,
+        integrationRule=SIMPSON, numIntPts=5)
+
+    m.HomogeneousShellSection(name='FlangeSection',
+        preIntegrate=OFF, material='StructuralSteel', thicknessType=UNIFORM,
+        thickness=D*2, thicknessField='', nodalThicknessField='',
+        idealization=NO_IDEALIZATION, poissonDefinition=DEFAULT,
+        thicknessModulus=None, temperature=GRADIENT, useDensity=OFF,
+        integrationRule=SIMPSON, numIntPts=5)
+
+    m.HomogeneousShellSection(name='EdgeFlangeSection',
+        preIntegrate=OFF, material='StructuralSteel', thicknessType=UNIFORM,
+        thickness=D, thicknessField='', nodalThicknessField='',
+        idealization=NO_IDEALIZATION, poissonDefinition=DEFAULT,
+        thicknessModulus=None, temperature=GRADIENT, useDensity=OFF,
+        integrationRule=SIMPSON, numIntPts=5)
+
+    # Section assignments. Faces are picked by bounding box instead of one
+    # findAt probe per face: the web faces are the only ones in the x = 0
+    # plane and each flange pair lies in a y = k*A plane.
+    f = p.faces
+    tol = 0.01
+    # Flange planes y = 0, A, ..., A*E as plain floats for the kernel calls
+    flange_ys = (np.arange(E + 1) * float(A)).tolist()
+
+    def flange_faces(y):
+        return f.getByBoundingBox(xMin=-B/2 - tol, xMax=B/2 + tol,
+            yMin=y - tol, yMax=y + tol, zMin=-tol, zMax=L + tol)
+
+    # Web sections
+    section_faces = [('WebSection', f.getByBoundingBox(xMin=-tol, xMax=tol,
+        yMin=-tol, yMax=A*E + tol, zMin=-tol, zMax=L + tol))]
+
+    # Outer flanges (single plate) at the bottom and top of the section
+    section_faces.append(('EdgeFlangeSection',
+        flange_faces(flange_ys[0]) + flange_faces(flange_ys[-1])))
+
+    # Inner flanges (two plates back to back) between adjacent segments
+    if E != 1:
+        faces = flange_faces(flange_ys[1])
+        for y in flange_ys[2:-1]:
+            faces = faces + flange_faces(y)
+        section_faces.append(('FlangeSection', faces))
+
+    # All face queries are done before the first assignment is issued
+    for section_name, faces in section_faces:
+        p.SectionAssignment(region=regionToolset.Region(faces=faces),
+            sectionName=section_name, offset=0.0, offsetType=MIDDLE_SURFACE,
+            offsetField='', thicknessAssignment=FROM_SECTION)
+
+    # =========================================================================
+    # ASSEMBLY AND BOUNDARY CONDITIONS
+    # =========================================================================
+    a = m.rootAssembly
+    if not HEADLESS:
+        session.viewports['Viewport: 1'].setValues(displayedObject=a)
+    a.DatumCsysByDefault(CARTESIAN)
+    a.Instance(name='ShellPart-1', part=p, dependent=ON)
+
+    # Analysis step
+    if not HEADLESS:
+        session.viewports['Viewport: 1'].assemblyDisplay.setValues(
+            adaptiveMeshConstraints=ON)
+    m.BuckleStep(name='BucklingAnalysis', previous='Initial',
+        numEigen=10, eigensolver=LANCZOS, minEigen=None, blockSize=DEFAULT,
+        maxBlocks=DEFAULT)
+    if not HEADLESS:
+        session.viewports['Viewport: 1'].assemblyDisplay.setValues(
+            step='BucklingAnalysis')
+
+    # Create sets for boundary conditions
+    # Top and bottom attachment points at the section centre of each end
+    end_points = (np.array([[0.0, 0.5, 1.0], [0.0, 0.5, 0.0]]) *
+                  (1.0, A*E, L)).tolist()
+    for name, point in zip(('Top', 'Bottom'), end_points):
+        a.AttachmentPoints(name=name + 'Attachment', points=(tuple(point),))
+        verts1 = a.vertices.findAt((tuple(point),))
+        a.Set(vertices=verts1, name=name + 'Point')
+
+    # Create surface sets for MPC constraints: every shell edge in the end
+    # plane, collected with one bounding-box query per end
+    e1 = a.instances['ShellPart-1'].edges
+    for surface_name, z_position in (('TopSurface', L), ('BottomSurface', 0.0)):
+        edges = e1.getByBoundingBox(xMin=-B, xMax=B, yMin=-1, yMax=A*E + 1,
+            zMin=z_position - 0.01, zMax=z_position + 0.01)
+        a.Set(edges=edges, name=surface_name)
+
+    # Multipoint constraints
+    region1 = a.sets['TopPoint']
+    region2 = a.sets['TopSurface']
+    m.MultipointConstraint(name='TopMPC',
+        controlPoint=region1, surface=region2, mpcType=BEAM_MPC,
+        userMode=DOF_MODE_MPC, userType=0, csys=None)
+
+    region1 = a.sets['BottomPoint']
+    region2 = a.sets['BottomSurface']
+    m.MultipointConstraint(name='BottomMPC',
+        controlPoint=region1, surface=region2, mpcType=BEAM_MPC,
+        userMode=DOF_MODE_MPC, userType=0, csys=None)
+
+    # Boundary conditions
+    region = a.sets['TopPoint']
+    m.DisplacementBC(name='TopBC', createStepName='Initial',
+        region=region, u1=SET, u2=SET, u3=UNSET, ur1=SET, ur2=SET, ur3=SET,
+        amplitude=UNSET, distributionType=UNIFORM, fieldName='', localCsys=None)
+
+    # Apply boundary conditions based on the set's own load factors
+    cf1f, cf2f, cf3f = params.cf1f, params.cf2f, params.cf3f
+    if cf1f != 0:
+        m.boundaryConditions['TopBC'].setValuesInStep(
+            stepName='BucklingAnalysis', u1=FREED, buckleCase=PERTURBATION_AND_BUCKLING)
+    if cf2f != 0:
+        m.boundaryConditions['TopBC'].setValuesInStep(
+            stepName='BucklingAnalysis', u2=FREED, buckleCase=PERTURBATION_AND_BUCKLING)
+
+    # Bottom boundary condition
+    region = a.sets['BottomPoint']
+    m.DisplacementBC(name='BottomBC', createStepName='Initial',
+        region=region, u1=SET, u2=SET, u3=SET, ur1=SET, ur2=SET, ur3=SET,
+        amplitude=UNSET, distributionType=UNIFORM, fieldName='', localCsys=None)
+
+    # Load application
+    region = a.sets['TopPoint']
+    m.ConcentratedForce(name='AppliedLoad', 
+        createStepName='BucklingAnalysis', region=region, cf1=cf1f, cf2=cf2f, 
+        cf3=cf3f, distributionType=UNIFORM, field='', localCsys=None)
+
+    # =========================================================================
+    # MESHING
+    # =========================================================================
+    if not HEADLESS:
+        session.viewports['Viewport: 1'].setValues(displayedObject=p)
+    p.seedPart(size=meshsz, deviationFactor=0.1, minSizeFactor=0.1)
+    # All faces are rectangles, so a structured S4R quad mesh is always
+    # possible; it keeps the stiffness matrix bandwidth (and Lanczos fill-in)
+    # lower than a free mixed quad/tri mesh
+    faces = p.faces.getByBoundingBox(xMin=-B/2 - 0.01, xMax=B/2 + 0.01,
+        yMin=-0.01, yMax=A*E + 0.01, zMin=-0.01, zMax=L + 0.01)
+    p.setMeshControls(regions=faces, elemShape=QUAD, technique=STRUCTURED)
+    p.setElementType(regions=(faces,), elemTypes=(
+        mesh.ElemType(elemCode=S4R, elemLibrary=STANDARD,
+                      hourglassControl=ENHANCED),
+        mesh.ElemType(elemCode=S3, elemLibrary=STANDARD)))
+    p.generateMesh()
+
+    # =========================================================================
+    # OUTPUT CONFIGURATION
+    # =========================================================================
+    # Configure output: add nodal displacement file output after the field
+    # output request, located by keyword rather than a fixed block index
+    kb = m.keywordBlock
+    kb.synchVersions(storeNodesAndElements=False)
+    for idx, block in enumerate(kb.sieBlocks):
+        if block.lstrip().lower().startswith('*output, field, variable=preselect'):
+            kb.insert(idx, "*NODE FILE,GLOBAL=YES\nU,")
+            break
+
+    # Write the template input deck; cases are run from copies of it
+    mdb.Job(name=job_name, model=model_name, description='Shell Buckling Analysis',
+        type=ANALYSIS, atTime=None, waitMinutes=0, waitHours=0, queue=None, memory=90,
+        memoryUnits=PERCENTAGE, getMemoryFromAnalysis=True,
+        explicitPrecision=SINGLE, nodalOutputPrecision=SINGLE, echoPrint=OFF,
+        modelPrint=OFF, contactPrint=OFF, historyPrint=OFF, userSubroutine='',
+        scratch='', resultsFormat=ODB, multiprocessingMode=THREADS,
+        numCpus=NUM_CPUS, numDomains=NUM_CPUS, numGPUs=0)
+    mdb.jobs[job_name].writeInput(consistencyChecking=OFF)
+
+    # Save model
+    model_file = os.path.join(working_dir, job_name + '.cae')
+    mdb.saveAs(pathName=model_file)
+
+    with open(os.path.join(working_dir, job_name + '.inp')) as f:
+        return f.read().splitlines()
 
-# =============================================================================
-# MESHING
-# =============================================================================
-p = mdb.models['Model-1'].parts['ShellPart']
-session.viewports['Viewport: 1'].setValues(displayedObject=p)
-p.seedPart(size=meshsz, deviationFactor=0.1, minSizeFactor=0.1)
-p.generateMesh()
 
 # =============================================================================
 # ANALYSIS EXECUTION
 # =============================================================================
-# Configure output
-mdb.models['Model-1'].keywordBlock.synchVersions(storeNodesAndElements=False)
-if E != 1:
-    mdb.models['Model-1'].keywordBlock.replace(67, """
-    *Output, field, variable=PRESELECT
-    *NODE FILE,GLOBAL=YES
-    U,""")
-else:
-    mdb.models['Model-1'].keywordBlock.replace(59, """
-    *Output, field, variable=PRESELECT
-    *NODE FILE,GLOBAL=YES
-    U,""")
-
-# Create and submit job
-mdb.Job(name='BucklingAnalysis', model='Model-1', description='Shell Buckling Analysis',
-    type=ANALYSIS, atTime=None, waitMinutes=0, waitHours=0, queue=None, memory=90,
-    memoryUnits=PERCENTAGE, getMemoryFromAnalysis=True,
-    explicitPrecision=SINGLE, nodalOutputPrecision=SINGLE, echoPrint=OFF,
-    modelPrint=OFF, contactPrint=OFF, historyPrint=OFF, userSubroutine='',
-    scratch='', resultsFormat=ODB, multiprocessingMode=DEFAULT, numCpus=1,
-    numGPUs=0)
-
-mdb.jobs['BucklingAnalysis'].submit(consistencyChecking=OFF)
-mdb.jobs['BucklingAnalysis'].waitForCompletion()
+def write_case_input(template_lines, job_name, loads, template_loads):
+    """Copy the template deck with the *Cload data lines set to the case loads"""
+    if [v != 0 for v in loads[:2]] != [v != 0 for v in template_loads[:2]]:
+        raise ValueError('Load case %r frees different DOFs than the template '
+                         'deck; run it with a separate model build' % (loads,))
+
+    out = []
+    i = 0
+    while i < len(template_lines):
+        line = template_lines[i]
+        out.append(line)
+        i += 1
+        if not line.lower().startswith('*cload'):
+            continue
+        # Data lines run until the next keyword or comment line
+        node = template_lines[i].split(',')[0].strip()
+        while i < len(template_lines) and not template_lines[i].startswith('*'):
+            i += 1
+        for dof, value in enumerate(loads, 1):
+            if value != 0:
+                out.append('%s, %d, %r' % (node, dof, float(value)))
+
+    inp_file = os.path.join(solve_dir, job_name + '.inp')
+    with open(inp_file, 'w') as f:
+        f.write('\n'.join(out) + '\n')
+    return inp_file
+
+
+def start_case(template_lines, job_name, loads, template_loads):
+    """Write the deck for one load case and launch its solve in the background"""
+    write_case_input(template_lines, job_name, loads, template_loads)
+    command = ('abaqus job=%s input=%s.inp cpus=%d mp_mode=threads'
+               % (job_name, job_name, CPUS_PER_JOB))
+    if RAMDISK_DIR:
+        command += ' scratch="%s"' % RAMDISK_DIR
+    return subprocess.Popen(command + ' interactive', shell=True, cwd=solve_dir)
+
+
+def collect_case_files(job_name):
+    """Move a finished job's files from the RAM disk to working_dir"""
+    if solve_dir == working_dir:
+        return
+    for path in glob.glob(os.path.join(solve_dir, job_name + '.*')):
+        target = os.path.join(working_dir, os.path.basename(path))
+        if os.path.exists(target):
+            os.remove(target)
+        shutil.move(path, target)
+
+
+def run_cases(params, template_name, template_lines):
+    """Solve all load cases, keeping up to MAX_CONCURRENT_JOBS solves running
+
+    Returns the names of the jobs that failed.
+    """
+    own_loads = (params.cf1f, params.cf2f, params.cf3f)
+    load_cases = [own_loads] + [tuple(loads) for loads in EXTRA_LOAD_CASES
+                                if tuple(loads) != own_loads]
+    pending = [('%s_%d' % (template_name, index), loads)
+               for index, loads in enumerate(load_cases, 1)]
+    running = []
+    failed = []
+    while pending or running:
+        while pending and len(running) < MAX_CONCURRENT_JOBS:
+            job_name, loads = pending.pop(0)
+            proc = start_case(template_lines, job_name, loads, own_loads)
+            running.append((proc, job_name, loads))
+
+        for item in list(running):
+            proc, job_name, loads = item
+            if proc.poll() is None:
+                continue
+            running.remove(item)
+            if proc.returncode != 0:
+                print("Job %s failed (exit code %d)" % (job_name, proc.returncode))
+                failed.append(job_name)
+            else:
+                cf1, cf2, cf3 = loads
+                case_params = params._replace(cf1f=cf1, cf2f=cf2, cf3f=cf3)
+                postprocess_case(job_name, _name(case_params),
+                                 param_record(case_params))
+            collect_case_files(job_name)
+        if running:
+            time.sleep(POLL_INTERVAL)
+    return failed
+
 
 # =============================================================================
 # RESULTS PROCESSING
 # =============================================================================
-a = mdb.models['Model-1'].rootAssembly
-session.viewports['Viewport: 1'].setValues(displayedObject=a)
-
-# Open results database
-odb_path = os.path.join(working_dir, 'BucklingAnalysis.odb')
-o3 = session.openOdb(name=odb_path)
-session.viewports['Viewport: 1'].setValues(displayedObject=o3)
-session.viewports['Viewport: 1'].makeCurrent()
-session.viewports['Viewport: 1'].odbDisplay.display.setValues(
-    plotState=(CONTOURS_ON_DEF,))
-
-# Generate field report
-odb = session.odbs[odb_path]
-session.fieldReportOptions.setValues(printXYData=OFF, printTotal=OFF)
-
-# Write results to file
-results_file = os.path.join(working_dir, f'buckling_results_{printname}.csv')
-session.writeFieldReport(
-    fileName=results_file, append=OFF, sortItem='NodeLabel', odb=odb, 
-    step=0, frame=1, outputPosition=NODAL, 
-    variable=(('U', NODAL), ('UR', NODAL),), stepFrame=SPECIFY)
-
-# Visualization settings
-session.graphicsOptions.setValues(backgroundStyle=SOLID, backgroundColor='#FFFFFF')
-session.viewports['Viewport: 1'].viewportAnnotationOptions.setValues(
-    triadPosition=(8, 9), legendBox=ON, legendPosition=(2, 98), title=ON,
-    statePosition=(13, 12), annotations=ON, compass=ON)
-
-# Save visualization
-image_file = os.path.join(working_dir, f'buckling_contour_{printname}.tiff')
-session.printToFile(fileName=image_file, format=TIFF, 
-                   canvasObjects=(session.viewports['Viewport: 1'],))
-
-# Save model
-model_file = os.path.join(working_dir, 'BucklingAnalysis.cae')
-mdb.saveAs(pathName=model_file)
-
-print("Analysis completed successfully.")
-print(f"Results saved to: {working_dir}")
+def normalize_mode(u, rec):
+    """Scale a mode shape so its largest nodal translation equals nodedeform"""
+    peak = np.sqrt((u.astype(np.float64) ** 2).sum(axis=1)).max()
+    if peak == 0:
+        return np.zeros_like(u)
+    return (u * (rec['nodedeform'] / peak)).astype(u.dtype)
+
+
+def _ur_rows(u_block, ur_block):
+    """Return the UR rows of ur_block in the node order of u_block"""
+    u_labels = np.asarray(u_block.nodeLabels)
+    ur_labels = np.asarray(ur_block.nodeLabels)
+    ur_data = np.asarray(ur_block.data)
+    if np.array_equal(u_labels, ur_labels):
+        return ur_data
+    order = np.argsort(ur_labels)
+    rows = order[np.clip(np.searchsorted(ur_labels[order], u_labels),
+                         0, len(order) - 1)]
+    if not np.array_equal(ur_labels[rows], u_labels):
+        raise ValueError('U and UR nodes differ on instance %s'
+                         % u_block.instance.name)
+    return ur_data[rows]
+
+
+def postprocess_case(job_name, printname, rec):
+    """Write the mode shape, imperfection field and image for one case"""
+    # Open results database
+    odb_path = os.path.join(solve_dir, job_name + '.odb')
+    o3 = session.openOdb(name=odb_path)
+
+    # Read the first buckling mode straight from the bulk data blocks
+    # (columns: node label, U1-U3, UR1-UR3); UR blocks are matched to the
+    # U blocks by instance name and then row by row on the node labels
+    odb = session.odbs[odb_path]
+    frame = odb.steps['BucklingAnalysis'].frames[1]
+    u_blocks = frame.fieldOutputs['U'].bulkDataBlocks
+    ur_blocks = dict((b.instance.name, b)
+                     for b in frame.fieldOutputs['UR'].bulkDataBlocks)
+    labels = np.concatenate([b.nodeLabels for b in u_blocks])
+    u = np.concatenate([b.data for b in u_blocks])
+    ur = np.concatenate([_ur_rows(b, ur_blocks[b.instance.name])
+                         for b in u_blocks])
+
+    # Write results to file
+    results_file = os.path.join(working_dir,
+                                'buckling_results_%s.npy' % printname)
+    # The ODB holds single precision (nodalOutputPrecision=SINGLE), so float32
+    # loses nothing and halves the file; labels are exact below 2**24
+    np.save(results_file, np.column_stack([labels, u, ur]).astype(np.float32))
+
+    # Imperfection field: first mode scaled to the node deformation limit
+    imperfection_file = os.path.join(working_dir,
+                                     'imperfection_%s.npy' % printname)
+    np.save(imperfection_file, np.column_stack(
+        [labels, normalize_mode(u, rec)]).astype(np.float32))
+
+    # Save visualization
+    if not HEADLESS:
+        session.viewports['Viewport: 1'].setValues(displayedObject=o3)
+        session.viewports['Viewport: 1'].makeCurrent()
+        session.viewports['Viewport: 1'].odbDisplay.display.setValues(
+            plotState=(CONTOURS_ON_DEF,))
+        image_file = os.path.join(working_dir,
+                                  'buckling_contour_%s.tiff' % printname)
+        session.printToFile(fileName=image_file, format=TIFF, 
+                           canvasObjects=(session.viewports['Viewport: 1'],))
+    odb.close()
+
+
+def run(params, set_id=1):
+    """Build, solve and post-process one parameter set in its own model
+
+    Returns the names of the failed load case jobs.
+    """
+    model_name = 'Model-%d' % set_id
+    job_name = '%s-%d' % (JOB_NAME, set_id)
+    mdb.Model(name=model_name)
+    template_lines = build_model_once(params, model_name, job_name)
+    failed = run_cases(params, job_name, template_lines)
+    del mdb.jobs[job_name]
+    del mdb.models[model_name]
+    return failed
+
+
+if __name__ == '__main__':
+    # Visualization settings
+    if not HEADLESS:
+        session.graphicsOptions.setValues(backgroundStyle=SOLID,
+                                          backgroundColor='#FFFFFF')
+        session.viewports['Viewport: 1'].viewportAnnotationOptions.setValues(
+            triadPosition=(8, 9), legendBox=ON, legendPosition=(2, 98),
+            title=ON, statePosition=(13, 12), annotations=ON, compass=ON)
+
+    failed = []
+    for set_id, p in enumerate(PARAM_SETS, 1):
+        failed.extend(run(p, set_id))
+
+    if failed:
+        print("Analysis finished with %d failed job(s): %s"
+              % (len(failed), ', '.join(failed)))
+        print("Results saved to: %s" % working_dir)
+        sys.exit(1)
+    print("Analysis completed successfully.")
+    print("Results saved to: %s" % working_dir)
@@ -11,6 +11,17 @@ from abaqusConstants import *
 from caeModules import *
 from driverUtils import executeOnCaeStartup
 import os
+import sys
+import time
+
+import numpy as np
+
+# Shared helpers live next to this script, which is not on sys.path when
+# it is run through "abaqus cae noGUI=..."
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+from solver_resources import cuda_available, logical_cpu_count, socket_count
 
 # =============================================================================
 # ANALYSIS CONFIGURATION
@@ -48,6 +59,21 @@ LOAD_DIRECTION_Z = 0.0     # Z-direction loading factor
 MAX_DISPLACEMENT = 60.0    # Maximum displacement (mm)
 IMPERFECTION_FACTOR = 6.0  # Initial imperfection factor
 
+# Output parameters
+FIELD_OUTPUT_FREQUENCY = 1 # Write field output every N Riks increments
+
+# Solver resources
+NUM_CPUS = logical_cpu_count()  # Cores for the Riks solve
+POLL_INTERVAL = 5                # Seconds between solver status checks
+
+# GPU acceleration of the direct sparse solver, CPU-only when no GPU is found
+NUM_GPUS = 1 if cuda_available() else 0
+
+# Hybrid MPI + threads: one MPI rank (and domain) per socket, threads within
+NUM_SOCKETS = socket_count()
+THREADS_PER_RANK = max(NUM_CPUS // NUM_SOCKETS, 1)
+os.environ.setdefault('OMP_PROC_BIND', 'close')
+
 # =============================================================================
 # FILE MANAGEMENT
 # =============================================================================
@@ -89,8 +115,9 @@ try:
 except:
     print("Warning: Base model file not found, proceeding with new model")
 
-# Create model copy for nonlinear analysis
-mdb.Model(name='BucklingAnalysis', objectToCopy=mdb.models['Model-1'])
+# Reuse the base model in place for the nonlinear analysis; Elastic.cae on
+# disk stays untouched, so no second copy of the model is held in memory
+mdb.models.changeKey(fromName='Model-1', toName='BucklingAnalysis')
 mdb.models['BucklingAnalysis'].keywordBlock.synchVersions(
     storeNodesAndElements=False)
 
@@ -140,7 +167,8 @@ mdb.models['BucklingAnalysis'].StaticRiksStep(
     name='BucklingStep', previous='Initial', nodeOn=ON,
     maximumDisplacement=MAX_DISPLACEMENT, region=reference_point, 
     dof=controlled_dof, maxNumInc=1000, initialArcInc=0.001, 
-    maxArcInc=0.2, nlgeom=ON)
+    maxArcInc=0.2, nlgeom=ON, matrixSolver=DIRECT,
+    matrixStorage=SOLVER_DEFAULT)
 
 mdb.models['BucklingAnalysis'].steps['BucklingStep'].setValues(minArcInc=1e-06)
 
@@ -153,7 +181,40 @@ mdb.models['BucklingAnalysis'].historyOutputRequests['H-Output-1'].setValues(
     variables=('ALLAE', ))
 
 mdb.models['BucklingAnalysis'].fieldOutputRequests['F-Output-1'].setValues(
-    variables=('S', 'PE', 'PEEQ', 'PEMAG', 'LE', 'U', 'RF', 'CF'))
+    variables=('S', 'PE', 'PEEQ', 'PEMAG', 'LE', 'U', 'RF', 'CF'),
+    frequency=FIELD_OUTPUT_FREQUENCY)
+
+# =============================================================================
+# RESULT EXTRACTION
+# =============================================================================
+
+# Reference point histories are read straight from the field output blocks:
+# one row per frame, columns are the frame value then magnitude and
+# components for each variable
+OUTPUT_VARIABLES = ('RF', 'RM', 'U', 'UR')
+
+
+def frame_row(frame, region):
+    """Return the history row of one odb frame for the given node set"""
+    row = np.empty(1 + 4 * len(OUTPUT_VARIABLES))
+    row[0] = frame.frameValue
+    for j, var in enumerate(OUTPUT_VARIABLES):
+        field = frame.fieldOutputs[var].getSubset(region=region)
+        values = field.bulkDataBlocks[0].data[0]
+        row[1 + 4 * j] = np.linalg.norm(values)
+        row[2 + 4 * j:5 + 4 * j] = values
+    return row
+
+
+def read_new_frames(odb, rows):
+    """Append rows for the frames written since the last call"""
+    if 'BucklingStep' not in odb.steps.keys():
+        return
+    region = odb.rootAssembly.nodeSets['REFERENCEPOINT']
+    frames = odb.steps['BucklingStep'].frames
+    for i in range(len(rows), len(frames)):
+        rows.append(frame_row(frames[i], region))
+
 
 # =============================================================================
 # JOB SUBMISSION
@@ -163,54 +224,77 @@ mdb.models['BucklingAnalysis'].fieldOutputRequests['F-Output-1'].setValues(
 mdb.Job(name='BucklingAnalysis', model='BucklingAnalysis', 
         description='Steel column buckling analysis', type=ANALYSIS,
         memory=90, memoryUnits=PERCENTAGE, 
-        multiprocessingMode=THREADS, numCpus=24, numDomains=24)
+        multiprocessingMode=MPI, numCpus=NUM_SOCKETS * THREADS_PER_RANK,
+        numDomains=NUM_SOCKETS, numThreadsPerMpiProcess=THREADS_PER_RANK,
+        numGPUs=NUM_GPUS)
 
-mdb.jobs['BucklingAnalysis'].submit(consistencyChecking=OFF)
+# Remove the ODB of an earlier run first: the polling loop below opens the
+# file as soon as it exists, and an open handle would stop the solver from
+# replacing it on Windows
+results_path = os.path.join(PROJECT_DIR, 'BucklingAnalysis.odb')
+if results_path in session.odbs.keys():
+    session.odbs[results_path].close()
+if os.path.exists(results_path):
+    os.remove(results_path)
+
+job = mdb.jobs['BucklingAnalysis']
+job.submit(consistencyChecking=OFF)
 
 # Display assembly
-assembly = mdb.models['Model-1'].rootAssembly
+assembly = mdb.models['BucklingAnalysis'].rootAssembly
 session.viewports['Viewport: 1'].setValues(displayedObject=assembly)
 
+# Extract completed frames while the solver is still writing later ones
+rows = []
+odb = None
+while job.status in (SUBMITTED, RUNNING):
+    time.sleep(POLL_INTERVAL)
+    if odb is None:
+        if os.path.exists(results_path):
+            odb = session.openOdb(name=results_path, readOnly=True)
+    else:
+        odb.update()
+    if odb is not None:
+        read_new_frames(odb, rows)
+
 # Wait for analysis completion
-mdb.jobs['BucklingAnalysis'].waitForCompletion()
+job.waitForCompletion()
 
 # =============================================================================
 # POST-PROCESSING
 # =============================================================================
 
-# Open results database
-results_path = os.path.join(PROJECT_DIR, 'BucklingAnalysis.odb')
-odb = session.openOdb(name=results_path)
+# Pick up the frames written after the last poll
+if odb is None:
+    if not os.path.exists(results_path):
+        print(f"Job ended with status {job.status}; no ODB at {results_path}")
+        sys.exit(1)
+    odb = session.openOdb(name=results_path, readOnly=True)
+else:
+    odb.update()
+read_new_frames(odb, rows)
+if not rows:
+    print(f"No frames of BucklingStep found in {results_path}")
+    sys.exit(1)
+history = np.array(rows)
+
 session.viewports['Viewport: 1'].setValues(displayedObject=odb)
 session.viewports['Viewport: 1'].odbDisplay.display.setValues(
     plotState=(CONTOURS_ON_DEF, ))
 
-# Extract nodal results
-session.xyDataListFromField(
-    odb=odb, outputPosition=NODAL, 
-    variable=(('RF', NODAL), ('RM', NODAL), ('U', NODAL), ('UR', NODAL)), 
-    nodeSets=("REFERENCEPOINT", ))
-
 # Save comprehensive results to CSV
-output_data = []
-for var in ['RF:Magnitude', 'RF:RF1', 'RF:RF2', 'RF:RF3', 
-            'RM:Magnitude', 'RM:RM1', 'RM:RM2', 'RM:RM3',
-            'U:Magnitude', 'U:U1', 'U:U2', 'U:U3',
-            'UR:Magnitude', 'UR:UR1', 'UR:UR2', 'UR:UR3']:
-    output_data.append(session.xyDataObjects[f'{var} PI: ASSEMBLY N: 2'])
-
+header = ['Frame'] + [f'{var}:{comp}' for var in OUTPUT_VARIABLES
+                      for comp in ('Magnitude', f'{var}1', f'{var}2', f'{var}3')]
 csv_filename = os.path.join(RESULTS_DIR, f'buckling_analysis_{analysis_id}.csv')
-session.writeXYReport(fileName=csv_filename, appendMode=OFF, 
-                     xyData=tuple(output_data))
-
-# Save simplified results for column curve
-reaction_forces = [session.xyDataObjects[f'RF:RF{i} PI: ASSEMBLY N: 2'] 
-                   for i in range(1, 4)]
-session.xyReportOptions.setValues(xyData=OFF, minMax=ON)
+np.savetxt(csv_filename, history, delimiter=',', header=','.join(header),
+           comments='')
 
+# Save simplified results for column curve (min/max reaction forces)
+reaction_forces = history[:, 2:5]
+summary = np.vstack([reaction_forces.min(axis=0), reaction_forces.max(axis=0)])
 summary_filename = os.path.join(RESULTS_DIR, 'column_curve_summary.rpt')
-session.writeXYReport(fileName=summary_filename, appendMode=OFF,
-                     xyData=tuple(reaction_forces))
+np.savetxt(summary_filename, summary, delimiter=',', header='RF1,RF2,RF3',
+           comments='')
 
 # =============================================================================
 # VISUALIZATION AND PLOTTING
@@ -239,9 +323,11 @@ session.viewports['Viewport: 1'].view.setValues(
                  COLUMN_LENGTH / 2))
 session.viewports['Viewport: 1'].view.fitView()
 
-# Export visualization
-image_filename = os.path.join(RESULTS_DIR, f'deformation_plot_{analysis_id}.tiff')
-session.printToFile(fileName=image_filename, format=TIFF,
+# Export visualization as PNG at a fixed size, without palette reduction
+session.pngOptions.setValues(imageSize=(1920, 1080))
+session.printOptions.setValues(reduceColors=False)
+image_filename = os.path.join(RESULTS_DIR, f'deformation_plot_{analysis_id}.png')
+session.printToFile(fileName=image_filename, format=PNG,
                    canvasObjects=(session.viewports['Viewport: 1'],))
 
 print(f"Analysis completed successfully. Results saved to: {RESULTS_DIR}")
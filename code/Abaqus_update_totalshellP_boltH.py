@@ -14,6 +14,8 @@ from caeModules import *
 from driverUtils import executeOnCaeStartup
 import os
 
+import numpy as np
+
 # =============================================================================
 # ANALYSIS PARAMETERS
 # =============================================================================
@@ -49,6 +51,9 @@ LOAD_FACTOR_Z = 0.0         # Z-direction load factor
 IMPERFECTION_FACTOR = 0.01  # Geometric imperfection factor
 MAX_DISPLACEMENT = 60.0     # Maximum displacement in Riks analysis (mm)
 
+# Output parameters
+FIELD_OUTPUT_FREQUENCY = 1  # Write field output every N Riks increments
+
 # =============================================================================
 # FILE MANAGEMENT
 # =============================================================================
@@ -134,7 +139,8 @@ mdb.models['Nonlinear-Analysis'].historyOutputRequests['H-Output-1'].setValues(
     variables=('ALLAE', ))
 
 mdb.models['Nonlinear-Analysis'].fieldOutputRequests['F-Output-1'].setValues(
-    variables=('S', 'PE', 'PEEQ', 'PEMAG', 'LE', 'U', 'RF', 'CF'))
+    variables=('S', 'PE', 'PEEQ', 'PEMAG', 'LE', 'U', 'RF', 'CF'),
+    frequency=FIELD_OUTPUT_FREQUENCY)
 
 # =============================================================================
 # GEOMETRIC IMPERFECTIONS
@@ -151,34 +157,49 @@ imperfection_block = """
 ** STEP: Buckling-Analysis
 **"""
 
-# Position imperfection command based on connection configuration
-if NUMBER_OF_SPLICES == 1:
-    line_number = 54
-elif NUMBER_OF_SPLICES == 2:
-    line_number = 94 + (VERTICAL_BOLT_ROWS - 1) * 30
-else:
-    line_number = 145 + 37 * (NUMBER_OF_SPLICES - 3) + \
-                 (VERTICAL_BOLT_ROWS - 1) * (60 + 30 * (NUMBER_OF_SPLICES - 3))
 
+
+def imperfection_line(n_splices, n_rows):
+    """Return the keyword block line that takes the *IMPERFECTION command"""
+    if n_splices == 1:
+        return 54
+    if n_splices == 2:
+        return 94 + (n_rows - 1) * 30
+    return 145 + 37 * (n_splices - 3) + \
+        (n_rows - 1) * (60 + 30 * (n_splices - 3))
+
+
+# Position imperfection command based on connection configuration
+line_number = imperfection_line(NUMBER_OF_SPLICES, VERTICAL_BOLT_ROWS)
 mdb.models['Nonlinear-Analysis'].keywordBlock.replace(
     line_number, imperfection_block)
 
 # =============================================================================
 # BOLT REGION OUTPUT REQUESTS
 # =============================================================================
-request_number = 1
 if NUMBER_OF_SPLICES >= 2:
-    for splice in range(NUMBER_OF_SPLICES - 1):
-        for bolt_row in range(VERTICAL_BOLT_ROWS):
-            assembly = mdb.models['Nonlinear-Analysis'].rootAssembly
-            edges = assembly.edges
-            
-            # Left bolt set
-            left_edges = edges.findAt(((-BOLT_GAUGE, 
-                                      (splice + 1) * COLUMN_HEIGHT,
-                                      (bolt_row + 1) * (COLUMN_LENGTH / (VERTICAL_BOLT_ROWS + 1))), ))
-            assembly.Set(edges=left_edges, name=f'BoltSet-{request_number}')
-            
+    assembly = mdb.models['Nonlinear-Analysis'].rootAssembly
+
+    # Bolt positions as one coordinate table, ordered (splice, bolt row,
+    # left/right) so that row i gives BoltSet-(i+1)
+    n_rows = VERTICAL_BOLT_ROWS
+    splice_idx, row_idx, side_idx = np.meshgrid(
+        np.arange(NUMBER_OF_SPLICES - 1), np.arange(n_rows), np.arange(2),
+        indexing='ij')
+    bolt_coords = np.column_stack([
+        np.where(side_idx.ravel() == 0, -BOLT_GAUGE, BOLT_GAUGE),
+        (splice_idx.ravel() + 1) * COLUMN_HEIGHT,
+        (row_idx.ravel() + 1) * (COLUMN_LENGTH / (n_rows + 1))])
+
+    # One findAt per bolt: a batched call neither keeps point order nor
+    # keeps coincident edges apart, so sets could land on the wrong bolt
+    for i, point in enumerate(bolt_coords.tolist()):
+        request_number = i + 1
+        bolt_edge = assembly.edges.findAt((tuple(point),))
+        assembly.Set(edges=bolt_edge, name=f'BoltSet-{request_number}')
+
+        # Output requests on the left bolt set of each pair
+        if i % 2 == 0:
             region_def = assembly.sets[f'BoltSet-{request_number}']
             mdb.models['Nonlinear-Analysis'].FieldOutputRequest(
                 name=f'BoltOutput-{request_number}', 
@@ -188,14 +209,6 @@ if NUMBER_OF_SPLICES >= 2:
                           'CPOINTLOAD', 'CDISP', 'CFORCE', 'CSTATUS', 
                           'CTF', 'CEF', 'CU', 'CUE', 'CUP'),
                 region=region_def, sectionPoints=DEFAULT, rebar=EXCLUDE)
-            
-            # Right bolt set  
-            right_edges = edges.findAt(((BOLT_GAUGE,
-                                       (splice + 1) * COLUMN_HEIGHT,
-                                       (bolt_row + 1) * (COLUMN_LENGTH / (VERTICAL_BOLT_ROWS + 1))), ))
-            assembly.Set(edges=right_edges, name=f'BoltSet-{request_number + 1}')
-            
-            request_number += 2
 
 # =============================================================================
 # JOB SUBMISSION
@@ -216,39 +229,30 @@ odb_path = os.path.join(results_dir, 'Nonlinear-Analysis.odb')
 odb = session.openOdb(name=odb_path)
 session.viewports['Viewport: 1'].setValues(displayedObject=odb)
 
-# Extract reaction forces and displacements from top node
-top_node_id = 2 + (NUMBER_OF_SPLICES - 1) * 4 + 4 * (NUMBER_OF_SPLICES - 1) * (VERTICAL_BOLT_ROWS - 1)
-
-session.xyDataListFromField(
-    odb=odb, outputPosition=NODAL, 
-    variable=(('RF', NODAL), ('RM', NODAL), ('U', NODAL), ('UR', NODAL)), 
-    nodeSets=("TopNode",))
+# Extract reaction forces and displacements from top node, one row per
+# frame: frame value, RF magnitude, RF1-RF3, U1-U3
+top_node = odb.rootAssembly.nodeSets['TOPNODE']
+frames = odb.steps['Buckling-Analysis'].frames
+results = np.empty((len(frames), 8))
+for i, frame in enumerate(frames):
+    rf = frame.fieldOutputs['RF'].getSubset(region=top_node).bulkDataBlocks[0].data[0]
+    u = frame.fieldOutputs['U'].getSubset(region=top_node).bulkDataBlocks[0].data[0]
+    results[i, 0] = frame.frameValue
+    results[i, 1] = np.linalg.norm(rf)
+    results[i, 2:5] = rf
+    results[i, 5:8] = u
 
 # Generate comprehensive results report
-session.xyReportOptions.setValues(xyData=ON, totals=OFF, minMax=OFF)
-session.writeXYReport(
-    fileName=os.path.join(results_dir, f'CompleteResults_{analysis_id}.csv'),
-    appendMode=OFF,
-    xyData=(
-        session.xyDataObjects[f'RF:Magnitude PI: ASSEMBLY N: {top_node_id}'],
-        session.xyDataObjects[f'RF:RF1 PI: ASSEMBLY N: {top_node_id}'],
-        session.xyDataObjects[f'RF:RF2 PI: ASSEMBLY N: {top_node_id}'],
-        session.xyDataObjects[f'RF:RF3 PI: ASSEMBLY N: {top_node_id}'],
-        session.xyDataObjects[f'U:U1 PI: ASSEMBLY N: {top_node_id}'],
-        session.xyDataObjects[f'U:U2 PI: ASSEMBLY N: {top_node_id}'],
-        session.xyDataObjects[f'U:U3 PI: ASSEMBLY N: {top_node_id}']
-    ))
-
-# Generate simplified results for column curves
-session.xyReportOptions.setValues(xyData=OFF, totals=OFF, minMax=ON)
-session.writeXYReport(
-    fileName=os.path.join(results_dir, f'ColumnCurve_{analysis_id}.rpt'),
-    appendMode=OFF,
-    xyData=(
-        session.xyDataObjects[f'RF:RF1 PI: ASSEMBLY N: {top_node_id}'],
-        session.xyDataObjects[f'RF:RF2 PI: ASSEMBLY N: {top_node_id}'],
-        session.xyDataObjects[f'RF:RF3 PI: ASSEMBLY N: {top_node_id}']
-    ))
+np.savetxt(os.path.join(results_dir, f'CompleteResults_{analysis_id}.csv'),
+           results, fmt='%.6e', delimiter=',',
+           header='Frame,RF:Magnitude,RF:RF1,RF:RF2,RF:RF3,U:U1,U:U2,U:U3',
+           comments='')
+
+# Generate simplified results for column curves (min/max reaction forces)
+reaction_forces = results[:, 2:5]
+np.savetxt(os.path.join(results_dir, f'ColumnCurve_{analysis_id}.rpt'),
+           np.vstack([reaction_forces.min(axis=0), reaction_forces.max(axis=0)]),
+           fmt='%.6e', delimiter=',', header='RF1,RF2,RF3', comments='')
 
 # =============================================================================
 # VISUALIZATION AND PLOTTING
@@ -275,10 +279,12 @@ session.viewports['Viewport: 1'].view.setValues(
     cameraTarget=(0, NUMBER_OF_SPLICES * COLUMN_HEIGHT / 2, COLUMN_LENGTH / 2))
 session.viewports['Viewport: 1'].view.fitView()
 
-# Save visualization
+# Save visualization as PNG at a fixed size, without palette reduction
+session.pngOptions.setValues(imageSize=(1920, 1080))
+session.printOptions.setValues(reduceColors=False)
 session.printToFile(
-    fileName=os.path.join(results_dir, f'DeformationPlot_{analysis_id}.tiff'),
-    format=TIFF, canvasObjects=(session.viewports['Viewport: 1'],))
+    fileName=os.path.join(results_dir, f'DeformationPlot_{analysis_id}.png'),
+    format=PNG, canvasObjects=(session.viewports['Viewport: 1'],))
 
 print(f"Analysis completed successfully. Results saved in: {results_dir}")
 
@@ -13,7 +13,14 @@ from abaqus import *
 from abaqusConstants import *
 from caeModules import *
 from driverUtils import executeOnCaeStartup
+import argparse
+import io
 import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
 
 # Initialize Abaqus session
 session.Viewport(name='Viewport: 1', origin=(0.0, 0.0), 
@@ -54,26 +61,131 @@ DISPLACEMENT_2 = 1.0
 DISPLACEMENT_3 = 381462.847
 MAX_DISPLACEMENT = 60.0
 IMPERFECTION_MAGNITUDE = 6.0
-
-def generate_case_name():
-    """Generate descriptive case name for output files"""
+FIELD_OUTPUT_FREQUENCY = 10  # Increments between whole-model field outputs
+INITIAL_ARC_INC = 0.0001  # First Riks arc length increment
+MAX_ARC_INC = 1.0
+
+
+def parse_case_arguments():
+    """Parse case parameters passed after '--' on the abaqus command line,
+    e.g. abaqus cae noGUI=<this script> -- --splices 2 --bolts 6.
+    Anything not given keeps the default defined above."""
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser(description='Nonlinear analysis case')
+    parser.add_argument('--height', type=int, default=SECTION_HEIGHT)
+    parser.add_argument('--width', type=int, default=SECTION_WIDTH)
+    parser.add_argument('--web-thickness', type=float, default=WEB_THICKNESS)
+    parser.add_argument('--flange-thickness', type=float,
+                        default=FLANGE_THICKNESS)
+    parser.add_argument('--length', type=int, default=MEMBER_LENGTH)
+    parser.add_argument('--splices', type=int, default=NUMBER_OF_SPLICES)
+    parser.add_argument('--bolts', type=int, default=NUMBER_OF_BOLTS)
+    parser.add_argument('--friction', type=float, default=FRICTION_COEFFICIENT)
+    parser.add_argument('--imperfection', type=float,
+                        default=IMPERFECTION_MAGNITUDE)
+    parser.add_argument('--initial-arc-inc', type=float,
+                        default=INITIAL_ARC_INC)
+    return parser.parse_args(argv)
+
+
+CASE_ARGS = parse_case_arguments()
+SECTION_HEIGHT = CASE_ARGS.height
+SECTION_WIDTH = CASE_ARGS.width
+WEB_THICKNESS = CASE_ARGS.web_thickness
+FLANGE_THICKNESS = CASE_ARGS.flange_thickness
+MEMBER_LENGTH = CASE_ARGS.length
+NUMBER_OF_SPLICES = CASE_ARGS.splices
+NUMBER_OF_BOLTS = CASE_ARGS.bolts
+FRICTION_COEFFICIENT = CASE_ARGS.friction
+IMPERFECTION_MAGNITUDE = CASE_ARGS.imperfection
+INITIAL_ARC_INC = CASE_ARGS.initial_arc_inc
+
+# Solver resources
+CPUS_PER_JOB = 24                                         # Cores per solve
+
+
+def run_job(job, patch_input=None, while_solving=None):
+    """Write the input deck, solve it and wait; returns True if the analysis
+    completed. patch_input, if given, is called with the .inp path before the
+    solve, which then runs from that deck. while_solving, if given, is called
+    after submission so that it overlaps with the solve."""
+    job.writeInput(consistencyChecking=OFF)
+    inp_path = f'{job.name}.inp'
+    if patch_input is not None:
+        patch_input(inp_path)
+    settings = dict(type=ANALYSIS, memory=job.memory,
+                    memoryUnits=job.memoryUnits,
+                    multiprocessingMode=job.multiprocessingMode,
+                    numCpus=job.numCpus, numDomains=job.numDomains,
+                    numGPUs=job.numGPUs)
+    name = job.name
+    del mdb.jobs[name]
+    job = mdb.JobFromInputFile(name=name, inputFileName=inp_path, **settings)
+    job.submit(consistencyChecking=OFF)
+    if while_solving is not None:
+        while_solving()
+    job.waitForCompletion()
+    if job.status != COMPLETED:
+        print(f"Job {name} did not complete (status {job.status}); "
+              f"see {name}.sta/.msg")
+        return False
+    return True
+
+
+def generate_geometry_name():
+    """Name of the geometry whose elastic base run this case starts from"""
     return (f"H{SECTION_HEIGHT}B{SECTION_WIDTH}t{WEB_THICKNESS}"
             f"tf{FLANGE_THICKNESS}L{MEMBER_LENGTH}S{NUMBER_OF_SPLICES}"
             f"B{NUMBER_OF_BOLTS}D{BOLT_DIAMETER}")
 
-# Set working directory
+
+def generate_variant_name():
+    """Name of the nonlinear variant of that geometry"""
+    return f"I{IMPERFECTION_MAGNITUDE}F{FRICTION_COEFFICIENT}"
+
+
+def generate_case_name():
+    """Generate descriptive case name for output files. Every swept
+    parameter is part of it, so parallel cases never share a directory."""
+    return generate_geometry_name() + generate_variant_name()
+
+# Deformation plots are rendered by a separate abaqus viewer process; resolve
+# its script before changing directory
+RENDER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'render_deformation.py')
+
+# Set working directory. Absolute, because the script chdirs into it below.
+# The elastic base run (Elastic.cae, Base-Analysis.fil) lives in the geometry
+# directory; each imperfection/friction variant solves in its own subdirectory
+# so that cases of a sweep never clash on job or result files.
 CASE_NAME = generate_case_name()
-WORK_DIR = os.path.join("research_data", "nonlinear_analysis", CASE_NAME)
+BASE_DIR = os.path.abspath(
+    os.path.join("research_data", "nonlinear_analysis", generate_geometry_name()))
+WORK_DIR = os.path.join(BASE_DIR, generate_variant_name())
 RESULTS_DIR = os.path.join(WORK_DIR, "results")
+BASE_FILES = ('Elastic.cae', 'Base-Analysis.fil')
 
-if not os.path.exists(RESULTS_DIR):
-    os.makedirs(RESULTS_DIR)
+# Every file path the case reads or writes, built once
+PATHS = {
+    'base_model': os.path.join(WORK_DIR, 'Elastic.cae'),
+    'odb': os.path.join(WORK_DIR, 'Nonlinear-Analysis.odb'),
+    'results_csv': os.path.join(RESULTS_DIR, f'NonlinearResults_{CASE_NAME}.csv'),
+    'curve_csv': os.path.join(RESULTS_DIR, 'LoadDisplacementCurve.csv'),
+    'plot_png': os.path.join(RESULTS_DIR, f'DeformationPlot_{CASE_NAME}.png'),
+}
+
+os.makedirs(RESULTS_DIR, exist_ok=True)
+
+# Private copies of the base files: the model database is opened (and locked)
+# by every case, and *IMPERFECTION reads the .fil from the working directory
+for base_file in BASE_FILES:
+    if not os.path.exists(os.path.join(WORK_DIR, base_file)):
+        shutil.copy2(os.path.join(BASE_DIR, base_file), WORK_DIR)
 
 os.chdir(WORK_DIR)
 
 # Open base model
-base_model_path = os.path.join(WORK_DIR, "Elastic.cae")
-openMdb(pathName=base_model_path)
+openMdb(pathName=PATHS['base_model'])
 
 session.viewports['Viewport: 1'].setValues(displayedObject=None)
 model_part = mdb.models['Model-1'].parts['Part-1']
@@ -131,8 +243,8 @@ nonlinear_model.StaticRiksStep(
     region=reference_region,
     dof=degree_of_freedom,
     maxNumInc=1000,
-    initialArcInc=0.0001,
-    maxArcInc=1,
+    initialArcInc=INITIAL_ARC_INC,
+    maxArcInc=MAX_ARC_INC,
     nlgeom=ON
 )
 
@@ -150,25 +262,47 @@ nonlinear_model.historyOutputRequests['H-Output-1'].setValues(
     variables=('ALLAE',)
 )
 
+# Whole-model fields are only needed for the deformation contour, so write
+# them every FIELD_OUTPUT_FREQUENCY increments (the last increment is always
+# written); the reference point history read in post-processing gets its own
+# small request on every increment
 nonlinear_model.fieldOutputRequests['F-Output-1'].setValues(
-    variables=('S', 'PE', 'PEEQ', 'PEMAG', 'LE', 'U', 'RF', 'CF')
+    variables=('S', 'U'),
+    frequency=FIELD_OUTPUT_FREQUENCY
+)
+
+nonlinear_model.FieldOutputRequest(
+    name='F-Output-RP',
+    createStepName='Nonlinear-Step',
+    variables=('RF', 'RM', 'U', 'UR'),
+    region=reference_region
 )
 
-# Configure imperfections
-nonlinear_model.keywordBlock.synchVersions(storeNodesAndElements=False)
+# Configure imperfections. The *IMPERFECTION block is patched into the written
+# input deck ahead of Step-2 rather than edited into the keyword block.
 nonlinear_model.keywordBlock.setValues(edited=0)
 
-imperfection_command = """
-** ----------------------------------------------------------------
-*IMPERFECTION,FILE=Base-Analysis, STEP=2
+imperfection_command = """*IMPERFECTION,FILE=Base-Analysis, STEP=2
 1,{0}
 **
-** STEP: Step-2
-**""".format(IMPERFECTION_MAGNITUDE)
-
-# Apply imperfections based on number of splices
-imperfection_line = 52 + (NUMBER_OF_SPLICES - 1) * 7
-nonlinear_model.keywordBlock.replace(imperfection_line, imperfection_command)
+""".format(IMPERFECTION_MAGNITUDE)
+
+
+def insert_imperfection(inp_path):
+    """Insert the *IMPERFECTION block just before the Step-2 header"""
+    with open(inp_path, 'r+') as inp:
+        lines = inp.readlines()
+        index = next((i for i, line in enumerate(lines)
+                      if line.strip() == '** STEP: Step-2'), None)
+        if index is None:
+            raise ValueError(f"{inp_path}: no '** STEP: Step-2' header to "
+                             f"insert the *IMPERFECTION block before")
+        # Keep the step's separator and blank comment lines together
+        while index > 0 and lines[index - 1].startswith('**'):
+            index -= 1
+        lines.insert(index, imperfection_command)
+        inp.seek(0)
+        inp.writelines(lines)
 
 # Create and submit job
 nonlinear_job = mdb.Job(
@@ -178,126 +312,105 @@ nonlinear_job = mdb.Job(
     type=ANALYSIS,
     memory=90,
     memoryUnits=PERCENTAGE,
-    multiprocessingMode=THREADS,
-    numCpus=24,
-    numDomains=24
+    multiprocessingMode=MPI,
+    numCpus=CPUS_PER_JOB,
+    numDomains=CPUS_PER_JOB,
+    numGPUs=0
 )
 
-nonlinear_job.submit(consistencyChecking=OFF)
 
-# Monitor analysis progress
-assembly = mdb.models['Model-1'].rootAssembly
-session.viewports['Viewport: 1'].setValues(displayedObject=assembly)
 
-nonlinear_job.waitForCompletion()
+def show_assembly():
+    """Display the assembly while the solver runs"""
+    assembly = mdb.models['Model-1'].rootAssembly
+    session.viewports['Viewport: 1'].setValues(displayedObject=assembly)
 
-# Post-processing
-results_path = os.path.join(WORK_DIR, 'Nonlinear-Analysis.odb')
-output_database = session.openOdb(name=results_path)
 
-session.viewports['Viewport: 1'].setValues(displayedObject=output_database)
-session.viewports['Viewport: 1'].odbDisplay.display.setValues(
-    plotState=(CONTOURS_ON_DEF,)
-)
-
-# Extract reaction forces and displacements
-odb = session.odbs[results_path]
-session.xyDataListFromField(
-    odb=odb,
-    outputPosition=NODAL,
-    variable=(
-        ('RF', NODAL),
-        ('RM', NODAL),
-        ('U', NODAL),
-        ('UR', NODAL),
-    ),
-    nodeSets=("REFERENCE_POINT",)
-)
+if not run_job(nonlinear_job, patch_input=insert_imperfection,
+               while_solving=show_assembly):
+    sys.exit(1)
 
-# Collect XY data objects
-reaction_data = {}
-for component in ['Magnitude', 'RF1', 'RF2', 'RF3']:
-    reaction_data[f'RF_{component}'] = session.xyDataObjects[
-        f'RF:{component} PI: ASSEMBLY N: 2'
-    ]
-
-for component in ['Magnitude', 'RM1', 'RM2', 'RM3']:
-    reaction_data[f'RM_{component}'] = session.xyDataObjects[
-        f'RM:{component} PI: ASSEMBLY N: 2'
-    ]
-
-for component in ['Magnitude', 'U1', 'U2', 'U3']:
-    reaction_data[f'U_{component}'] = session.xyDataObjects[
-        f'U:{component} PI: ASSEMBLY N: 2'
-    ]
-
-for component in ['Magnitude', 'UR1', 'UR2', 'UR3']:
-    reaction_data[f'UR_{component}'] = session.xyDataObjects[
-        f'UR:{component} PI: ASSEMBLY N: 2'
-    ]
-
-# Write comprehensive results
-session.writeXYReport(
-    fileName=os.path.join(RESULTS_DIR, f'NonlinearResults_{CASE_NAME}.csv'),
-    appendMode=OFF,
-    xyData=tuple(reaction_data.values())
-)
-
-# Write simplified results for curve plotting
-session.xyReportOptions.setValues(xyData=OFF, minMax=ON)
-session.writeXYReport(
-    fileName=os.path.join(RESULTS_DIR, 'LoadDisplacementCurve.csv'),
-    appendMode=OFF,
-    xyData=(
-        reaction_data['RF_RF1'],
-        reaction_data['RF_RF2'],
-        reaction_data['RF_RF3']
+# Post-processing
+RESULT_VARIABLES = ('RF', 'RM', 'U', 'UR')
+# Same columns as the xyData report this replaced: magnitude, then the
+# three components of each variable
+RESULTS_HEADER = ','.join(
+    ['t'] + [f'{var}:{comp}' for var in RESULT_VARIABLES
+             for comp in ('Magnitude', f'{var}1', f'{var}2', f'{var}3')])
+
+
+def extract_rp_results(odb):
+    """Read the reference point RF/RM/U/UR history from the odb.
+
+    The reference point node and the frame count are resolved once, outside
+    the frame loop. Returns the frame values and a dict of (n_frames, 3)
+    arrays keyed by variable.
+    """
+    rp_node = odb.rootAssembly.nodeSets['REFERENCE_POINT'].nodes[0][0]
+    frames = odb.steps['Nonlinear-Step'].frames
+    n_frames = len(frames)
+    frame_values = np.empty(n_frames)
+    rp_values = {variable: np.empty((n_frames, 3))
+                 for variable in RESULT_VARIABLES}
+    for i, frame in enumerate(frames):
+        frame_values[i] = frame.frameValue
+        field_outputs = frame.fieldOutputs
+        for variable in RESULT_VARIABLES:
+            field = field_outputs[variable].getSubset(region=rp_node)
+            rp_values[variable][i] = field.values[0].data
+    return frame_values, rp_values
+
+
+def write_csv(path, array, header):
+    """Format the whole array in memory, then write it with a single
+    buffered write instead of one small write per row"""
+    buffer = io.BytesIO()
+    np.savetxt(buffer, array, fmt='%.6g', delimiter=',', header=header,
+               comments='')
+    with open(path, 'wb', buffering=65536) as csv_file:
+        csv_file.write(buffer.getvalue())
+
+
+def write_reports(frame_values, rp_values):
+    """Write the full result table and the min/max reaction force curve"""
+    # One row per frame: frame value, then magnitude and components of
+    # RF, RM, U and UR
+    columns = [frame_values]
+    for variable in RESULT_VARIABLES:
+        values = rp_values[variable]
+        columns += [np.linalg.norm(values, axis=1), values]
+    results = np.column_stack(columns)
+    write_csv(PATHS['results_csv'], results, RESULTS_HEADER)
+
+    reaction_forces = rp_values['RF']
+    write_csv(
+        PATHS['curve_csv'],
+        np.vstack([reaction_forces.min(axis=0), reaction_forces.max(axis=0)]),
+        'RF1,RF2,RF3'
     )
-)
 
-# Configure visualization settings
-session.graphicsOptions.setValues(
-    backgroundStyle=SOLID,
-    backgroundColor='#FFFFFF'
-)
 
-session.viewports['Viewport: 1'].viewportAnnotationOptions.setValues(
-    triadPosition=(8, 9),
-    legendBox=ON,
-    legendPosition=(2, 98),
-    title=ON,
-    statePosition=(13, 12),
-    annotations=ON,
-    compass=ON,
-    triadFont='-*-verdana-bold-r-normal-*-*-120-*-*-p-*-*-*',
-    stateFont='-*-verdana-medium-r-normal-*-*-120-*-*-p-*-*-*',
-    titleFont='-*-verdana-medium-r-normal-*-*-120-*-*-p-*-*-*',
-    legendFont='-*-verdana-medium-r-normal-*-*-120-*-*-p-*-*-*'
-)
+def launch_render(odb_path):
+    """Start rendering the deformation plot in the background; the viewer
+    process is not waited on, so this script can finish meanwhile"""
+    command = (f'abaqus viewer noGUI="{RENDER_SCRIPT}" -- "{odb_path}" '
+               f'"{PATHS["plot_png"]}" {MEMBER_LENGTH} {NUMBER_OF_SPLICES} '
+               f'{SECTION_HEIGHT}')
+    return subprocess.Popen(command, shell=True)
 
-# Adjust view
-session.viewports['Viewport: 1'].view.setValues(
-    nearPlane=1000,
-    farPlane=1001,
-    width=1000,
-    height=1000,
-    cameraPosition=(
-        MEMBER_LENGTH + NUMBER_OF_SPLICES * SECTION_HEIGHT,
-        -NUMBER_OF_SPLICES * SECTION_HEIGHT,
-        MEMBER_LENGTH * 1.5
-    ),
-    cameraUpVector=(0, 0, 50),
-    cameraTarget=(0, NUMBER_OF_SPLICES * SECTION_HEIGHT / 2, MEMBER_LENGTH / 2)
-)
 
-session.viewports['Viewport: 1'].view.fitView()
+def postprocess(odb_path):
+    """Extract results from a single read-only odb handle, then hand the
+    closed odb to the background renderer"""
+    odb = session.openOdb(name=odb_path, readOnly=True)
+    try:
+        write_reports(*extract_rp_results(odb))
+    finally:
+        odb.close()
+    launch_render(odb_path)
 
-# Export visualization
-session.printToFile(
-    fileName=os.path.join(RESULTS_DIR, f'DeformationPlot_{CASE_NAME}.tiff'),
-    format=TIFF,
-    canvasObjects=(session.viewports['Viewport: 1'],)
-)
+
+postprocess(PATHS['odb'])
 
 print("Nonlinear analysis completed successfully.")
 print(f"Results saved in: {RESULTS_DIR}")
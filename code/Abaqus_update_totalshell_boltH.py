@@ -9,9 +9,14 @@ Description: Automated parametric modeling of bolted shell structures for buckli
 
 from abaqus import *
 from abaqusConstants import *
-from caeModules import *
+# Only the CAE modules this script uses (caeModules would also load
+# optimization, xyPlot, connectorBehavior, ...)
+import part, material, section, assembly, step, interaction, load
+import mesh, job, sketch, visualization
+import regionToolset
 from driverUtils import executeOnCaeStartup
 import os
+import sys
 
 # =============================================================================
 # PARAMETRIC MODEL CONFIGURATION
@@ -48,6 +53,9 @@ LOAD_FACTOR_Y = 1.0
 LOAD_FACTOR_Z = 0.0
 IMPERFECTION_FACTOR = 0.01
 
+# Solver resources
+CPUS_PER_JOB = 16                                         # Cores per solve
+
 # =============================================================================
 # MODEL SETUP
 # =============================================================================
@@ -60,6 +68,9 @@ def setup_model():
     executeOnCaeStartup()
     session.viewports['Viewport: 1'].partDisplay.geometryOptions.setValues(
         referenceRepresentation=ON)
+    # Image export settings, set once for every plot written by this session
+    session.graphicsOptions.setValues(backingStore=ON)
+    session.pngOptions.setValues(imageSize=(1600, 1200))
 
 def create_output_directory():
     """Create output directory for results"""
@@ -71,8 +82,7 @@ def create_output_directory():
     output_path = './analysis_results/'
     full_path = output_path + model_name
     
-    if not os.path.exists(full_path):
-        os.makedirs(full_path)
+    os.makedirs(full_path, exist_ok=True)
     
     os.chdir(full_path)
     return model_name
@@ -94,22 +104,19 @@ def create_base_sketch():
         (-FLANGE_WIDTH/2, SECTION_HEIGHT - FLANGE_THICKNESS/2)
     ]
     
-    # Create profile lines
-    s.Line(point1=points[0], point2=points[1])
-    s.Line(point1=points[0], point2=points[2])
-    s.Line(point1=points[0], point2=points[3])
-    s.Line(point1=points[3], point2=points[4])
-    s.Line(point1=points[3], point2=points[5])
-    
-    # Add geometric constraints
-    s.HorizontalConstraint(entity=g[2])
-    s.HorizontalConstraint(entity=g[3])
-    s.ParallelConstraint(entity1=g[2], entity2=g[3])
-    s.PerpendicularConstraint(entity1=g[2], entity2=g[4])
-    s.HorizontalConstraint(entity=g[5])
-    s.PerpendicularConstraint(entity1=g[4], entity2=g[5])
-    s.HorizontalConstraint(entity=g[6])
-    s.PerpendicularConstraint(entity1=g[4], entity2=g[6])
+    # Create profile lines from (start, end) point index pairs; they become
+    # geometry g[2] (bottom flange) to g[6] (top flange)
+    for start, end in ((0, 1), (0, 2), (0, 3), (3, 4), (3, 5)):
+        s.Line(point1=points[start], point2=points[end])
+    
+    # Add geometric constraints in one pass once all lines exist: flanges
+    # horizontal and normal to the web, without per-constraint undo states
+    for i in (2, 3, 5, 6):
+        s.HorizontalConstraint(entity=g[i], addUndoState=False)
+    s.ParallelConstraint(entity1=g[2], entity2=g[3], addUndoState=False)
+    for i, j in ((2, 4), (4, 5), (4, 6)):
+        s.PerpendicularConstraint(entity1=g[i], entity2=g[j],
+                                  addUndoState=False)
     
     return s
 
@@ -123,25 +130,22 @@ def create_shell_part(sketch):
     p.regenerate()
     return p
 
-def create_bolt_holes(part, is_center_section=False):
-    """Create bolt holes in the specified part"""
+def create_bolt_sketch(part):
+    """Build the bolt-hole sketch once so every part can reuse it.
+
+    The sketch is drawn on the uncut part; its copies share the same sketch
+    plane.
+    """
     f, e = part.faces, part.edges
-    
-    if is_center_section:
-        depth = SECTION_HEIGHT
-        origin_z = SECTION_LENGTH/2
-    else:
-        depth = FLANGE_THICKNESS
-        origin_z = SECTION_LENGTH/2
-        
     t = part.MakeSketchTransform(sketchPlane=f[0], sketchUpEdge=e[3],
                                 sketchPlaneSide=SIDE1, sketchOrientation=RIGHT,
-                                origin=(FLANGE_WIDTH/4, SECTION_HEIGHT-FLANGE_THICKNESS/2, origin_z))
+                                origin=(FLANGE_WIDTH/4, SECTION_HEIGHT-FLANGE_THICKNESS/2, SECTION_LENGTH/2))
     
     s = mdb.models['Model-1'].ConstrainedSketch(name='bolt_pattern', 
                                                 sheetSize=1091.12, 
                                                 gridSpacing=27.27, 
                                                 transform=t)
+    g = s.geometry
     s.setPrimaryObject(option=SUPERIMPOSE)
     part.projectReferencesOntoSketch(sketch=s, filter=COPLANAR_EDGES)
     
@@ -160,15 +164,21 @@ def create_bolt_holes(part, is_center_section=False):
                    spacing2=SECTION_LENGTH/(NUM_BOLT_ROWS + 1), angle2=90.0)
     
     s.delete(objectList=(g[11], g[12]))
+    s.unsetPrimaryObject()
+    return s
+
+def create_bolt_holes(part, s, is_center_section=False):
+    """Create bolt holes in the specified part from the bolt sketch s"""
+    if is_center_section:
+        depth = SECTION_HEIGHT
+    else:
+        depth = FLANGE_THICKNESS
     
     # Cut extrusion for bolt holes
     f1, e1 = part.faces, part.edges
     part.CutExtrude(sketchPlane=f1[0], sketchUpEdge=e1[3],
                    sketchPlaneSide=SIDE1, sketchOrientation=RIGHT,
                    sketch=s, depth=depth, flipExtrudeDirection=OFF)
-    
-    s.unsetPrimaryObject()
-    del mdb.models['Model-1'].sketches['bolt_pattern']
 
 def define_material_properties():
     """Define material properties and sections"""
@@ -188,10 +198,8 @@ def define_material_properties():
         preIntegrate=OFF, material='StructuralSteel', thicknessType=UNIFORM,
         thickness=FLANGE_THICKNESS, integrationRule=SIMPSON, numIntPts=5)
 
-def assign_sections():
-    """Assign sections to different parts of the model"""
-    # For end sections
-    p = mdb.models['Model-1'].parts['ShellSection']
+def assign_sections(p):
+    """Assign web and flange sections to the end section part"""
     faces = p.faces
     
     # Web assignment
@@ -252,6 +260,13 @@ def setup_analysis_steps():
     
     # Load step
     mdb.models['Model-1'].StaticStep(name='Load', previous='Buckling')
+    
+    # Only the final preloaded state is of interest; full output resumes in
+    # the load step
+    mdb.models['Model-1'].fieldOutputRequests['F-Output-1'].setValues(
+        frequency=LAST_INCREMENT)
+    mdb.models['Model-1'].fieldOutputRequests['F-Output-1'].setValuesInStep(
+        stepName='Load', frequency=1)
 
 def apply_boundary_conditions():
     """Apply boundary conditions and loads"""
@@ -279,21 +294,31 @@ def apply_boundary_conditions():
 
 def mesh_model():
     """Generate mesh for all parts"""
-    for part_name in ['ShellSection', 'ShellSection-Copy']:
-        if part_name in mdb.models['Model-1'].parts.keys():
-            p = mdb.models['Model-1'].parts[part_name]
-            p.seedPart(size=MESH_SIZE, deviationFactor=0.1, minSizeFactor=0.1)
-            p.generateMesh()
+    # Mesh every part in the model exactly once; parts that already carry a
+    # mesh (e.g. when re-running in the same session) are not re-meshed
+    for p in mdb.models['Model-1'].parts.values():
+        if len(p.elements) > 0:
+            continue
+        p.seedPart(size=MESH_SIZE, deviationFactor=0.1, minSizeFactor=0.1)
+        p.generateMesh()
 
 def create_and_run_job(model_name):
-    """Create and submit analysis job"""
+    """Create and submit analysis job; returns the job name, or None if the
+    analysis did not complete"""
     job_name = f'Analysis_{model_name}'
     
     mdb.Job(name=job_name, model='Model-1', type=ANALYSIS,
-            multiprocessingMode=THREADS, numCpus=16, numDomains=16)
-    
-    mdb.jobs[job_name].submit(consistencyChecking=OFF)
-    mdb.jobs[job_name].waitForCompletion()
+            memory=90, memoryUnits=PERCENTAGE,
+            multiprocessingMode=MPI, numCpus=CPUS_PER_JOB,
+            numDomains=CPUS_PER_JOB, numGPUs=0)
+    
+    job = mdb.jobs[job_name]
+    job.submit(consistencyChecking=OFF)
+    job.waitForCompletion()
+    if job.status != COMPLETED:
+        print(f"Job {job_name} did not complete (status {job.status}); "
+              f"see {job_name}.sta/.msg")
+        return None
     
     return job_name
 
@@ -310,8 +335,8 @@ def postprocess_results(job_name, model_name):
         outputPosition=NODAL, variable=(('U', NODAL), ('UR', NODAL),))
     
     # Visualization output
-    session.printToFile(fileName=f'deformation_plot_{model_name}.tiff',
-                       format=TIFF, 
+    session.printToFile(fileName=f'deformation_plot_{model_name}.png',
+                       format=PNG, 
                        canvasObjects=(session.viewports['Viewport: 1'],))
 
 # =============================================================================
@@ -336,13 +361,15 @@ def main():
     p_copy = mdb.models['Model-1'].Part(name='ShellSection-Center',
         objectToCopy=mdb.models['Model-1'].parts['ShellSection'])
     
-    # Create bolt holes
-    create_bolt_holes(shell_part, is_center_section=False)
-    create_bolt_holes(p_copy, is_center_section=True)
+    # Create bolt holes (one sketch, drawn before the first cut)
+    bolt_sketch = create_bolt_sketch(shell_part)
+    create_bolt_holes(shell_part, bolt_sketch, is_center_section=False)
+    create_bolt_holes(p_copy, bolt_sketch, is_center_section=True)
+    del mdb.models['Model-1'].sketches['bolt_pattern']
     
     # Material and section definitions
     define_material_properties()
-    assign_sections()
+    assign_sections(shell_part)
     
     # Assembly and interactions
     create_assembly()
@@ -357,11 +384,15 @@ def main():
     
     # Run analysis
     job_name = create_and_run_job(model_name)
+    if job_name is None:
+        return False
     
     # Postprocessing
     postprocess_results(job_name, model_name)
     
     print(f"Analysis completed successfully. Results saved in: {os.getcwd()}")
+    return True
 
 if __name__ == '__main__':
-    main()
+    if not main():
+        sys.exit(1)
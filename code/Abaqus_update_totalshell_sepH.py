@@ -9,18 +9,53 @@ Description: Script for parametric buckling analysis of steel structural compone
 
 from abaqus import *
 from abaqusConstants import *
-from caeModules import *
+# Only the CAE modules this script uses (caeModules would also load
+# optimization, xyPlot, connectorBehavior, ...)
+import part, material, section, assembly, step, interaction, load
+import mesh, job, sketch, visualization
+import regionToolset
 from driverUtils import executeOnCaeStartup
+import hashlib
+import logging
+import logging.handlers
 import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+
+# Shared helpers live next to this script, which is not on sys.path when
+# it is run through "abaqus cae noGUI=..."
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+from solver_resources import cuda_available, physical_core_count
+
+# Runs under "abaqus cae noGUI=..." (e.g. parameter sweeps) skip all viewport
+# updates and the deformation plot; only the numeric results are written
+HEADLESS = any('noGUI' in arg for arg in sys.argv)
+
+# Messages are buffered and written to stdout in one go at the end of the
+# case (or on an error) instead of one flush per line in long sweeps
+# (the handler is reused when the script is run again in the same session)
+logger = logging.getLogger('abq')
+if not logger.handlers:
+    logger.addHandler(logging.handlers.MemoryHandler(
+        capacity=1024, flushLevel=logging.ERROR,
+        target=logging.StreamHandler(sys.stdout)))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
 
 # Initialize Abaqus session
-session.Viewport(name='Viewport: 1', origin=(0.0, 0.0), 
-                 width=92.94, height=126.41)
-session.viewports['Viewport: 1'].makeCurrent()
-session.viewports['Viewport: 1'].maximize()
 executeOnCaeStartup()
-session.viewports['Viewport: 1'].partDisplay.geometryOptions.setValues(
-    referenceRepresentation=ON)
+if not HEADLESS:
+    session.Viewport(name='Viewport: 1', origin=(0.0, 0.0), 
+                     width=92.94, height=126.41)
+    session.viewports['Viewport: 1'].makeCurrent()
+    session.viewports['Viewport: 1'].maximize()
+    session.viewports['Viewport: 1'].partDisplay.geometryOptions.setValues(
+        referenceRepresentation=ON)
 
 # =============================================================================
 # PARAMETERS DEFINITION
@@ -42,6 +77,10 @@ ultimate_stress = 444.0 # Ultimate stress (MPa)
 ultimate_strain = 0.1576 # Ultimate strain
 mesh_size = 20         # Global mesh size (mm)
 mesh_size_bolt = 4     # Bolt mesh size (mm)
+# Number of buckling modes requested, the same in GUI and batch runs. Only
+# the first mode is used downstream and every extra mode costs Lanczos
+# iterations; raise it (e.g. to 10) to inspect higher modes
+num_eigen = 3
 
 # Load parameters
 load_x = 0.0
@@ -50,28 +89,76 @@ load_z = 381462.847
 max_displacement = 60.0
 node_deformation = 6.0
 
+# =============================================================================
+# SOLVER RESOURCES
+# =============================================================================
+# The direct sparse factorization does not gain from hyper-threads
+NUM_CPUS = physical_core_count()
+
+# GPU acceleration of the Lanczos factorizations, CPU-only when no GPU is found
+NUM_GPUS = 1 if cuda_available() else 0
+
 # =============================================================================
 # FILE MANAGEMENT
 # =============================================================================
-analysis_name = f'H{H}_B{B}_tw{t_web}_tf{t_flange}_L{L}_seg{N_segments}'
-analysis_name += f'_bolts{N_bolts}_D{Bolt_diameter}_fric{friction_coef}'
-analysis_name += f'_mesh{mesh_size}'
+analysis_name = 'H%s_B%s_tw%s_tf%s_L%s_seg%s' % (H, B, t_web, t_flange, L,
+                                                  N_segments)
+analysis_name += '_bolts%s_D%s_fric%s' % (N_bolts, Bolt_diameter, friction_coef)
+analysis_name += '_mesh%s' % mesh_size
 
 # Create results directory
 results_dir = './analysis_results/'
-if not os.path.exists(results_dir):
-    os.makedirs(results_dir)
-    
-analysis_folder = os.path.join(results_dir, analysis_name)
-if not os.path.exists(analysis_folder):
+analysis_folder = os.path.abspath(os.path.join(results_dir, analysis_name))
+if not os.path.isdir(analysis_folder):
     os.makedirs(analysis_folder)
 
+# Output files of this case, built once
+PATHS = {
+    'odb': os.path.join(analysis_folder, 'buckling_analysis.odb'),
+    'results_csv': os.path.join(analysis_folder, 'nodal_displacements.csv'),
+    'results_npy': os.path.join(analysis_folder, 'nodal_displacements.npy'),
+    'plot_png': os.path.join(analysis_folder, 'deformation_plot.png'),
+    'cae': os.path.join(analysis_folder, 'buckling_analysis.cae'),
+    'extract_log': os.path.join(analysis_folder, 'extract_nodal_results.log'),
+}
+
+# Post-processing scripts run in separate processes
+RENDER_SCRIPT = os.path.join(SCRIPT_DIR, 'render_deformation.py')
+EXTRACT_SCRIPT = os.path.join(SCRIPT_DIR, 'extract_nodal_results.py')
+
+# Restart cache: cases that differ only in the lateral load (applied in the
+# buckling step) share the mesh and the solved Static_Step, so the buckling
+# step is restarted from the stored base run instead of solving it again
+RESTART_EXTENSIONS = ('.res', '.mdl', '.stt', '.prt', '.odb', '.sim')
+restart_cache_dir = os.path.abspath(os.path.join(results_dir, '_restart_cache'))
+if not os.path.isdir(restart_cache_dir):
+    os.makedirs(restart_cache_dir)
+base_key = repr((H, B, t_web, t_flange, L, N_segments, mesh_size,
+                 friction_coef, load_z))
+base_job = 'buckling_base_%s' % hashlib.md5(base_key.encode()).hexdigest()
+# The marker is written last, and only for a completed base run, so a hit
+# never picks up the files of a failed run or of one still being stored
+restart_marker = os.path.join(restart_cache_dir, base_job + '.complete')
+restart_hit = os.path.exists(restart_marker)
+
+
+def store_in_cache(src, dst):
+    """Copy src to dst atomically: copy to a private temp name, then rename.
+    If a concurrent run has stored dst in the meantime, its copy is kept."""
+    tmp = '%s.%d.tmp' % (dst, os.getpid())
+    shutil.copy(src, tmp)
+    try:
+        os.rename(tmp, dst)
+    except OSError:  # dst exists (Windows)
+        os.remove(tmp)
+
 os.chdir(analysis_folder)
 
 # =============================================================================
 # MODEL SETUP
 # =============================================================================
-session.viewports['Viewport: 1'].setValues(displayedObject=None)
+if not HEADLESS:
+    session.viewports['Viewport: 1'].setValues(displayedObject=None)
 
 # Create sketch for cross-section
 sketch = mdb.models['Model-1'].ConstrainedSketch(name='cross_section', 
@@ -79,36 +166,40 @@ sketch = mdb.models['Model-1'].ConstrainedSketch(name='cross_section',
 g, v, d, c = sketch.geometry, sketch.vertices, sketch.dimensions, sketch.constraints
 sketch.setPrimaryObject(option=STANDALONE)
 
-# Define cross-section geometry
-sketch.Line(point1=(0.0, t_flange/2), point2=(B/2, t_flange/2))
-sketch.HorizontalConstraint(entity=g[2], addUndoState=False)
-sketch.Line(point1=(0.0, t_flange/2), point2=(-B/2, t_flange/2))
-sketch.HorizontalConstraint(entity=g[3], addUndoState=False)
+# Define cross-section geometry: vertices, then the lines between them as
+# (start, end) index pairs. The lines become g[2] (bottom flange) to g[6].
+section_points = ((0.0, t_flange/2), (B/2, t_flange/2), (-B/2, t_flange/2),
+                  (0.0, H-t_flange/2), (B/2, H-t_flange/2),
+                  (-B/2, H-t_flange/2))
+for start, end in ((0, 1), (0, 2), (0, 3), (3, 4), (3, 5)):
+    sketch.Line(point1=section_points[start], point2=section_points[end])
+
+# Constrain in one pass once all lines exist: flanges horizontal and normal
+# to the web
+for i in (2, 3, 5, 6):
+    sketch.HorizontalConstraint(entity=g[i], addUndoState=False)
 sketch.ParallelConstraint(entity1=g[2], entity2=g[3], addUndoState=False)
-sketch.Line(point1=(0.0, t_flange/2), point2=(0.0, H-t_flange/2))
-sketch.PerpendicularConstraint(entity1=g[2], entity2=g[4], addUndoState=False)
-sketch.Line(point1=(0.0, H-t_flange/2), point2=(B/2, H-t_flange/2))
-sketch.HorizontalConstraint(entity=g[5], addUndoState=False)
-sketch.PerpendicularConstraint(entity1=g[4], entity2=g[5], addUndoState=False)
-sketch.Line(point1=(0.0, H-t_flange/2), point2=(-B/2, H-t_flange/2))
-sketch.HorizontalConstraint(entity=g[6], addUndoState=False)
-sketch.PerpendicularConstraint(entity1=g[4], entity2=g[6], addUndoState=False)
+for i, j in ((2, 4), (4, 5), (4, 6)):
+    sketch.PerpendicularConstraint(entity1=g[i], entity2=g[j],
+                                   addUndoState=False)
 
 # Create 3D part by extrusion
 part = mdb.models['Model-1'].Part(name='SteelSection', dimensionality=THREE_D,
                                  type=DEFORMABLE_BODY)
 part.BaseShellExtrude(sketch=sketch, depth=L)
 sketch.unsetPrimaryObject()
-session.viewports['Viewport: 1'].setValues(displayedObject=part)
+if not HEADLESS:
+    session.viewports['Viewport: 1'].setValues(displayedObject=part)
 del mdb.models['Model-1'].sketches['cross_section']
 
 # =============================================================================
 # MATERIAL DEFINITION
 # =============================================================================
-session.viewports['Viewport: 1'].partDisplay.setValues(sectionAssignments=ON,
-    engineeringFeatures=ON)
-session.viewports['Viewport: 1'].partDisplay.geometryOptions.setValues(
-    referenceRepresentation=OFF)
+if not HEADLESS:
+    session.viewports['Viewport: 1'].partDisplay.setValues(sectionAssignments=ON,
+        engineeringFeatures=ON)
+    session.viewports['Viewport: 1'].partDisplay.geometryOptions.setValues(
+        referenceRepresentation=OFF)
 
 # Define steel material properties
 mdb.models['Model-1'].Material(name='Steel')
@@ -151,9 +242,10 @@ part.SectionAssignment(region=region, sectionName='flange_section', offset=0.0,
 # ASSEMBLY
 # =============================================================================
 assembly = mdb.models['Model-1'].rootAssembly
-session.viewports['Viewport: 1'].setValues(displayedObject=assembly)
-session.viewports['Viewport: 1'].assemblyDisplay.setValues(
-    optimizationTasks=OFF, geometricRestrictions=OFF, stopConditions=OFF)
+if not HEADLESS:
+    session.viewports['Viewport: 1'].setValues(displayedObject=assembly)
+    session.viewports['Viewport: 1'].assemblyDisplay.setValues(
+        optimizationTasks=OFF, geometricRestrictions=OFF, stopConditions=OFF)
 
 assembly.DatumCsysByDefault(CARTESIAN)
 part = mdb.models['Model-1'].parts['SteelSection']
@@ -173,46 +265,61 @@ if N_segments > 1:
 # Create sets for boundary conditions
 # (The original complex set creation logic is maintained but translated to English)
 
-# Top surface set
-if N_segments == 1:
-    edges = instance.edges.findAt(((-B/4, t_flange/2, L),), 
-                                 ((B/4, t_flange/2, L),),  
-                                 ((0, H/2, L),),
-                                 ((-B/4, H-t_flange/2, L),),  
-                                 ((B/4, H-t_flange/2, L),))
-    assembly.Set(edges=edges, name='top_surface')
-    
-# Similar logic for other segment counts...
-# (Maintaining the original pattern for 2-10 segments)
-
-# Bottom surface set
-# (Similar pattern as top surface)
-
-# Reference points for MPC constraints
-assembly.AttachmentPoints(name='top_ref_point', points=((0, H*N_segments/2, L),))
-verts = assembly.vertices.findAt(((0, H*N_segments/2, L),))
-assembly.Set(vertices=verts, name='top_point')
-
-assembly.AttachmentPoints(name='bottom_ref_point', points=((0, H*N_segments/2, 0),))
-verts = assembly.vertices.findAt(((0, H*N_segments/2, 0),))
-assembly.Set(vertices=verts, name='bottom_point')
+# Top and bottom surface sets: the four flange halves and the web edge at
+# each end of every segment instance, for any number of segments.
+# Coordinate table (x, y) of the five end edges of segment 0; segment k is
+# the same table shifted by k*H in y.
+END_EDGE_XY = np.array([[-B/4, t_flange/2], [B/4, t_flange/2], [0, H/2],
+                        [-B/4, H-t_flange/2], [B/4, H-t_flange/2]])
+SURFACE_Z = {'top_surface': L, 'bottom_surface': 0}
+
+segment_instances = [instance] + [
+    assembly.instances['SteelSection-1-lin-1-%d' % (k + 1)]
+    for k in range(1, N_segments)]
+
+# (N_segments, 5, 2) array of edge points for all segments at once
+segment_xy = (END_EDGE_XY[None, :, :]
+              + np.arange(N_segments)[:, None, None] * np.array([0.0, H]))
+
+for set_name, z in SURFACE_Z.items():
+    coords = np.concatenate(
+        (segment_xy, np.full(segment_xy.shape[:2] + (1,), float(z))), axis=2)
+    edges = None
+    for inst, points in zip(segment_instances, coords):
+        # One findAt per instance with all five points of that segment
+        found = inst.edges.findAt(*[(tuple(pt),) for pt in points.tolist()])
+        edges = found if edges is None else edges + found
+    assembly.Set(edges=edges, name=set_name)
+
+# Reference points for MPC constraints: both ends in one AttachmentPoints
+# feature; each vertex is looked up on its own, since a batched findAt
+# does not guarantee results in point order
+top_xyz, bottom_xyz = (0, H*N_segments/2, L), (0, H*N_segments/2, 0)
+assembly.AttachmentPoints(name='ref_points', points=(top_xyz, bottom_xyz))
+assembly.Set(vertices=assembly.vertices.findAt((top_xyz,)), name='top_point')
+assembly.Set(vertices=assembly.vertices.findAt((bottom_xyz,)), name='bottom_point')
 
 # =============================================================================
 # ANALYSIS STEPS
 # =============================================================================
-session.viewports['Viewport: 1'].assemblyDisplay.setValues(
-    adaptiveMeshConstraints=ON)
+if not HEADLESS:
+    session.viewports['Viewport: 1'].assemblyDisplay.setValues(
+        adaptiveMeshConstraints=ON)
 
 # Static step for pre-loading
 mdb.models['Model-1'].StaticStep(name='Static_Step', previous='Initial',
-    initialInc=0.00001, minInc=1e-08, maxInc=0.2)
+    initialInc=0.00001, minInc=1e-08, maxInc=0.2, matrixSolver=DIRECT)
+# Restart data at the end of the preload, reused by later lateral-load cases
+mdb.models['Model-1'].steps['Static_Step'].Restart(frequency=0,
+    numberIntervals=1, overlay=ON, timeMarks=OFF)
 
 # Buckling analysis step
 mdb.models['Model-1'].BuckleStep(name='Buckling_Step', previous='Static_Step',
-    numEigen=10, eigensolver=LANCZOS, minEigen=None, blockSize=DEFAULT,
-    maxBlocks=DEFAULT)
+    numEigen=num_eigen, eigensolver=LANCZOS, minEigen=None,
+    blockSize=min(2*num_eigen, 16), maxBlocks=50)
 
-session.viewports['Viewport: 1'].assemblyDisplay.setValues(step='Buckling_Step')
+if not HEADLESS:
+    session.viewports['Viewport: 1'].assemblyDisplay.setValues(step='Buckling_Step')
 
 # =============================================================================
 # CONSTRAINTS AND BOUNDARY CONDITIONS
@@ -236,13 +343,14 @@ mdb.models['Model-1'].DisplacementBC(name='top_BC', createStepName='Initial',
     region=region, u1=SET, u2=SET, u3=UNSET, ur1=SET, ur2=SET, ur3=SET,
     amplitude=UNSET, distributionType=UNIFORM, fieldName='', localCsys=None)
 
-# Adjust boundary conditions based on loading
-if load_x != 0:
+# Adjust boundary conditions based on loading: free the loaded lateral
+# directions in the buckling step with a single modification
+freed_dofs = {dof: FREED for dof, load in (('u1', load_x), ('u2', load_y))
+              if load != 0}
+if freed_dofs:
     mdb.models['Model-1'].boundaryConditions['top_BC'].setValuesInStep(
-        stepName='Buckling_Step', u1=FREED, buckleCase=PERTURBATION_AND_BUCKLING)
-if load_y != 0:
-    mdb.models['Model-1'].boundaryConditions['top_BC'].setValuesInStep(
-        stepName='Buckling_Step', u2=FREED, buckleCase=PERTURBATION_AND_BUCKLING)
+        stepName='Buckling_Step', buckleCase=PERTURBATION_AND_BUCKLING,
+        **freed_dofs)
 
 region = assembly.sets['bottom_point']
 mdb.models['Model-1'].DisplacementBC(name='bottom_BC', createStepName='Initial',
@@ -263,7 +371,8 @@ mdb.models['Model-1'].ConcentratedForce(name='lateral_load', createStepName='Buc
 # MESH GENERATION
 # =============================================================================
 part = mdb.models['Model-1'].parts['SteelSection']
-session.viewports['Viewport: 1'].setValues(displayedObject=part)
+if not HEADLESS:
+    session.viewports['Viewport: 1'].setValues(displayedObject=part)
 part.seedPart(size=mesh_size, deviationFactor=0.1, minSizeFactor=0.1)
 part.generateMesh()
 
@@ -281,88 +390,129 @@ mdb.models['Model-1'].interactionProperties['contact_prop'].NormalBehavior(
     pressureOverclosure=HARD, allowSeparation=ON,
     constraintEnforcementMethod=DEFAULT)
 
-session.viewports['Viewport: 1'].assemblyDisplay.setValues(step='Initial')
+if not HEADLESS:
+    session.viewports['Viewport: 1'].assemblyDisplay.setValues(step='Initial')
 mdb.models['Model-1'].ContactStd(name='global_contact', createStepName='Initial')
-mdb.models['Model-1'].interactions['global_contact'].includedPairs.setValuesInStep(
-    stepName='Initial', useAllstar=ON)
+if N_segments > 1:
+    # Separated segments can only touch their neighbours (flange on flange),
+    # so search those pairs instead of every face against every other face.
+    # The buckling step is a linear perturbation and keeps the contact
+    # status reached at the end of Static_Step.
+    for k, inst in enumerate(segment_instances):
+        assembly.Surface(side12Faces=inst.faces, name='segment_%d' % (k + 1))
+    neighbour_pairs = tuple(
+        (assembly.surfaces['segment_%d' % k], assembly.surfaces['segment_%d' % (k + 1)])
+        for k in range(1, N_segments))
+    mdb.models['Model-1'].interactions['global_contact'].includedPairs.setValuesInStep(
+        stepName='Initial', useAllstar=OFF, addPairs=neighbour_pairs)
+else:
+    mdb.models['Model-1'].interactions['global_contact'].includedPairs.setValuesInStep(
+        stepName='Initial', useAllstar=ON)
 mdb.models['Model-1'].interactions['global_contact'].contactPropertyAssignments.appendInStep(
     stepName='Initial', assignments=((GLOBAL, SELF, 'contact_prop'),))
 
 # =============================================================================
 # OUTPUT REQUESTS
 # =============================================================================
-# Configure field output for displacement results
-mdb.models['Model-1'].keywordBlock.synchVersions(storeNodesAndElements=False)
-mdb.models['Model-1'].keywordBlock.replace(75, """
-*Output, field, variable=PRESELECT
-*NODE FILE,GLOBAL=YES
-U,""")
+# Write the buckling mode displacements to the .fil file (read by the
+# *IMPERFECTION, FILE= nonlinear analysis). The card is inserted after the
+# buckling step's field output block, located by keyword rather than a fixed
+# block index; U/UR in the ODB come from the default PRESELECT request
+kb = mdb.models['Model-1'].keywordBlock
+kb.synchVersions(storeNodesAndElements=False)
+for idx in range(len(kb.sieBlocks) - 1, -1, -1):
+    if kb.sieBlocks[idx].lstrip().lower().startswith('*output, field, variable=preselect'):
+        kb.insert(idx, "*NODE FILE,GLOBAL=YES\nU,")
+        break
 
 # =============================================================================
 # JOB SUBMISSION
 # =============================================================================
+if restart_hit:
+    # The model up to Static_Step is identical to the base run: continue
+    # from its restart files with this case's buckling step only. The files
+    # are hard-linked where possible and removed again after the solve
+    for ext in RESTART_EXTENSIONS:
+        cached = os.path.join(restart_cache_dir, base_job + ext)
+        if os.path.exists(cached):
+            try:
+                os.link(cached, base_job + ext)
+            except (AttributeError, OSError):  # no os.link / other volume
+                shutil.copy(cached, base_job + ext)
+    mdb.models['Model-1'].setValues(restartJob=base_job,
+        restartStep='Static_Step')
+    logger.info("Restarting from cached base run: %s", base_job)
+
 job = mdb.Job(name='buckling_analysis', model='Model-1', description='Steel section buckling analysis',
-    type=ANALYSIS, atTime=None, waitMinutes=0, waitHours=0, queue=None, 
+    type=RESTART if restart_hit else ANALYSIS, atTime=None, waitMinutes=0, waitHours=0, queue=None, 
     memory=90, memoryUnits=PERCENTAGE, getMemoryFromAnalysis=True,
     explicitPrecision=SINGLE, nodalOutputPrecision=SINGLE, echoPrint=OFF,
     modelPrint=OFF, contactPrint=OFF, historyPrint=OFF, userSubroutine='',
-    scratch='', resultsFormat=ODB, multiprocessingMode=DEFAULT, numCpus=1,
-    numGPUs=0)
+    scratch='', resultsFormat=ODB, multiprocessingMode=THREADS, numCpus=NUM_CPUS,
+    numDomains=NUM_CPUS, numGPUs=NUM_GPUS)
 
 # Submit and monitor analysis
 job.submit(consistencyChecking=OFF)
 job.waitForCompletion()
+if restart_hit:
+    # The base files were only inputs of the restart
+    for ext in RESTART_EXTENSIONS:
+        if os.path.exists(base_job + ext):
+            os.remove(base_job + ext)
+if job.status != COMPLETED:
+    logger.error("Job buckling_analysis did not complete (status %s); see %s",
+                 job.status, os.path.join(analysis_folder, 'buckling_analysis.msg'))
+    raise RuntimeError('Buckling analysis did not complete: %s' % analysis_folder)
+
+# Store the restart files of a successful full run as the base for later cases
+if not restart_hit:
+    for ext in RESTART_EXTENSIONS:
+        if os.path.exists('buckling_analysis' + ext):
+            store_in_cache('buckling_analysis' + ext,
+                           os.path.join(restart_cache_dir, base_job + ext))
+    with open('restart_base.complete', 'w') as marker:
+        marker.write(base_key + '\n')
+    store_in_cache('restart_base.complete', restart_marker)
 
 # =============================================================================
 # POST-PROCESSING AND RESULTS EXTRACTION
 # =============================================================================
 assembly = mdb.models['Model-1'].rootAssembly
-session.viewports['Viewport: 1'].setValues(displayedObject=assembly)
-session.viewports['Viewport: 1'].assemblyDisplay.setValues(
-    adaptiveMeshConstraints=OFF, optimizationTasks=OFF,
-    geometricRestrictions=OFF, stopConditions=OFF)
-
-# Open results database
-odb_path = os.path.join(analysis_folder, 'buckling_analysis.odb')
-odb = session.openOdb(name=odb_path)
-session.viewports['Viewport: 1'].setValues(displayedObject=odb)
-session.viewports['Viewport: 1'].makeCurrent()
-session.viewports['Viewport: 1'].odbDisplay.display.setValues(plotState=(
-    CONTOURS_ON_DEF,))
-
-# Extract nodal results
-session.fieldReportOptions.setValues(printXYData=OFF, printTotal=OFF)
-results_file = os.path.join(analysis_folder, 'nodal_displacements.csv')
-session.writeFieldReport(fileName=results_file, append=OFF, sortItem='nodenumber', 
-                        odb=odb, step=1, frame=1, outputPosition=NODAL, 
-                        variable=(('U', NODAL), ('UR', NODAL),), stepFrame=SPECIFY)
+if not HEADLESS:
+    session.viewports['Viewport: 1'].setValues(displayedObject=assembly)
+    session.viewports['Viewport: 1'].assemblyDisplay.setValues(
+        adaptiveMeshConstraints=OFF, optimizationTasks=OFF,
+        geometricRestrictions=OFF, stopConditions=OFF)
+
+# U and UR of the first buckling mode are read by extract_nodal_results.py
+# under "abaqus python" (odbAccess only); it runs while the model is saved and
+# is waited on before the case is reported as done
+extract_log = open(PATHS['extract_log'], 'w')
+extract_proc = subprocess.Popen('abaqus python "%s" "%s" "%s" "%s"' % (
+    EXTRACT_SCRIPT, PATHS['odb'], PATHS['results_npy'], PATHS['results_csv']),
+    shell=True, stdout=extract_log, stderr=subprocess.STDOUT)
 
 # =============================================================================
 # VISUALIZATION AND PLOTTING
 # =============================================================================
-session.graphicsOptions.setValues(backgroundStyle=SOLID, backgroundColor='#FFFFFF')
-session.viewports['Viewport: 1'].viewportAnnotationOptions.setValues(
-    triadPosition=(8, 9), legendBox=ON, legendPosition=(2, 98), title=ON,
-    statePosition=(13, 12), annotations=ON, compass=ON,
-    triadFont='-*-verdana-bold-r-normal-*-*-120-*-*-p-*-*-*',
-    stateFont='-*-verdana-medium-r-normal-*-*-120-*-*-p-*-*-*',
-    titleFont='-*-verdana-medium-r-normal-*-*-120-*-*-p-*-*-*',
-    legendFont='-*-verdana-medium-r-normal-*-*-120-*-*-p-*-*-*')
-
-# Adjust view for better visualization
-session.viewports['Viewport: 1'].view.setValues(nearPlane=1000, farPlane=1001, 
-    width=1000, height=1000, cameraPosition=(L+N_segments*H, -N_segments*H, L*1.5), 
-    cameraUpVector=(0, 0, 50), cameraTarget=(0, N_segments*H/2, L/2), 
-    viewOffsetX=0, viewOffsetY=0)
-session.viewports['Viewport: 1'].view.fitView()
-
-# Save visualization
-figure_file = os.path.join(analysis_folder, 'deformation_plot.tiff')
-session.printToFile(fileName=figure_file, format=TIFF, 
-                   canvasObjects=(session.viewports['Viewport: 1'],))
+# The PNG is rendered by render_deformation.py in a background Abaqus/Viewer
+# process, so saving the model and the next case do not wait on it
+if not HEADLESS:
+    subprocess.Popen('abaqus viewer noGUI="%s" -- "%s" "%s" %s %s %s' % (
+        RENDER_SCRIPT, PATHS['odb'], PATHS['plot_png'], L, N_segments, H),
+        shell=True)
 
 # Save model database
-model_file = os.path.join(analysis_folder, 'buckling_analysis.cae')
-mdb.saveAs(pathName=model_file)
-
-print(f"Analysis completed successfully. Results saved in: {analysis_folder}")
+mdb.saveAs(pathName=PATHS['cae'])
+
+extract_rc = extract_proc.wait()
+extract_log.close()
+if extract_rc != 0:
+    logger.error("Nodal result extraction failed (exit code %s); see %s",
+                 extract_rc, PATHS['extract_log'])
+    raise RuntimeError('Nodal result extraction failed: %s' % analysis_folder)
+
+logger.info("Analysis completed successfully. Results saved in: %s",
+            analysis_folder)
+for handler in logger.handlers:
+    handler.flush()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Offline Nodal Results Extraction
+Description: Reads U and UR of the first buckling mode from a finished
+             analysis odb and writes them as .npy and .csv. Runs under
+             "abaqus python", which needs no Abaqus/CAE license, so the
+             analysis script can exit as soon as the solver is done.
+
+Usage:
+    abaqus python extract_nodal_results.py <odb> <npy> <csv>
+"""
+
+from odbAccess import openOdb
+import sys
+
+import numpy as np
+
+# The odb holds single precision results, so the binary copy stores them
+# as float32 without losing digits; node labels stay integers
+NODAL_DTYPE = np.dtype([('node', np.int32), ('U', np.float32, (3,)),
+                        ('UR', np.float32, (3,))])
+
+
+def _ur_rows(u_block, ur_block):
+    """Return the UR rows of ur_block in the node order of u_block"""
+    u_labels = np.asarray(u_block.nodeLabels)
+    ur_labels = np.asarray(ur_block.nodeLabels)
+    ur_data = np.asarray(ur_block.data)
+    if np.array_equal(u_labels, ur_labels):
+        return ur_data
+    order = np.argsort(ur_labels)
+    rows = order[np.clip(np.searchsorted(ur_labels[order], u_labels),
+                         0, len(order) - 1)]
+    if not np.array_equal(ur_labels[rows], u_labels):
+        raise ValueError('U and UR nodes differ on instance %s'
+                         % u_block.instance.name)
+    return ur_data[rows]
+
+
+def extract_nodal_results(odb_path, npy_path, csv_path,
+                          step_name='Buckling_Step'):
+    """Write node label, U1-U3 and UR1-UR3 of the first mode"""
+    odb = openOdb(path=odb_path, readOnly=True)
+    try:
+        # One bulk data block per instance; UR blocks are matched by
+        # instance name and then row by row on the node labels
+        mode_frame = odb.steps[step_name].frames[1]
+        u_blocks = mode_frame.fieldOutputs['U'].bulkDataBlocks
+        ur_blocks = {block.instance.name: block
+                     for block in mode_frame.fieldOutputs['UR'].bulkDataBlocks}
+        nodal_results = np.vstack([
+            np.column_stack((block.nodeLabels, block.data,
+                             _ur_rows(block, ur_blocks[block.instance.name])))
+            for block in u_blocks])
+    finally:
+        odb.close()
+
+    packed = np.empty(len(nodal_results), dtype=NODAL_DTYPE)
+    packed['node'] = nodal_results[:, 0]
+    packed['U'] = nodal_results[:, 1:4]
+    packed['UR'] = nodal_results[:, 4:7]
+    np.save(npy_path, packed)
+    np.savetxt(csv_path, nodal_results, delimiter=',', fmt='%.6e',
+               header='Node,U1,U2,U3,UR1,UR2,UR3', comments='')
+
+
+extract_nodal_results(sys.argv[1], sys.argv[2], sys.argv[3])
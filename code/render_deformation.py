@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Offline Deformation Plot Renderer
+Description: Renders the deformed contour plot of a finished analysis from its
+             odb in a separate Abaqus/Viewer process, so the analysis script
+             does not block on rendering.
+
+Usage:
+    abaqus viewer noGUI=render_deformation.py -- <odb> <png> <member length>
+                                                 <splices> <section height>
+"""
+
+from abaqus import *
+from abaqusConstants import *
+import visualization
+import sys
+
+
+def render_deformation(odb_path, image_path, member_length, n_splices,
+                       section_height):
+    """Plot the deformed contour of the odb and export it as PNG"""
+    odb = session.openOdb(name=odb_path, readOnly=True)
+    viewport = session.viewports['Viewport: 1']
+    viewport.setValues(displayedObject=odb)
+    viewport.odbDisplay.display.setValues(plotState=(CONTOURS_ON_DEF,))
+
+    # Configure visualization settings
+    session.graphicsOptions.setValues(
+        backgroundStyle=SOLID,
+        backgroundColor='#FFFFFF',
+        backingStore=ON
+    )
+    session.pngOptions.setValues(imageSize=(1600, 1200))
+
+    viewport.viewportAnnotationOptions.setValues(
+        triadPosition=(8, 9),
+        legendBox=ON,
+        legendPosition=(2, 98),
+        title=ON,
+        statePosition=(13, 12),
+        annotations=ON,
+        compass=ON,
+        triadFont='-*-verdana-bold-r-normal-*-*-120-*-*-p-*-*-*',
+        stateFont='-*-verdana-medium-r-normal-*-*-120-*-*-p-*-*-*',
+        titleFont='-*-verdana-medium-r-normal-*-*-120-*-*-p-*-*-*',
+        legendFont='-*-verdana-medium-r-normal-*-*-120-*-*-p-*-*-*'
+    )
+
+    # Adjust view
+    viewport.view.setValues(
+        nearPlane=1000,
+        farPlane=1001,
+        width=1000,
+        height=1000,
+        cameraPosition=(
+            member_length + n_splices * section_height,
+            -n_splices * section_height,
+            member_length * 1.5
+        ),
+        cameraUpVector=(0, 0, 50),
+        cameraTarget=(0, n_splices * section_height / 2, member_length / 2)
+    )
+    viewport.view.fitView()
+
+    # Export visualization
+    session.printToFile(
+        fileName=image_path,
+        format=PNG,
+        canvasObjects=(viewport,)
+    )
+    odb.close()
+
+
+args = sys.argv[sys.argv.index('--') + 1:]
+render_deformation(args[0], args[1], float(args[2]), int(args[3]),
+                   float(args[4]))
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Parametric Sweep Driver for the Nonlinear Separated-Wall Analysis
+Description: Runs Abaqus_update_totalshellP_sepH.py for every combination of
+             the sweep parameters below, several abaqus cae processes at a time.
+
+Run with a plain Python 3 interpreter, not inside Abaqus/CAE:
+    python run_sweep.py
+The CAE kernel is not fork-safe, so the parallelism lives here, at the level
+that launches the CAE processes, and never inside the analysis script.
+"""
+
+import itertools
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+# =============================================================================
+# SWEEP CONFIGURATION
+# =============================================================================
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      'Abaqus_update_totalshellP_sepH.py')
+
+# Values to sweep; every combination becomes one case
+SPLICES = (1, 2, 3)
+BOLTS = (4, 6)
+IMPERFECTIONS = (3.0, 6.0)
+
+# Each case runs its solve on CPUS_PER_JOB cores (see the analysis script)
+CPUS_PER_JOB = 24
+MAX_WORKERS = max(1, (os.cpu_count() or 1) // CPUS_PER_JOB)
+
+
+def run_case(case):
+    """Run one case through abaqus cae and return its exit code"""
+    splices, bolts, imperfection = case
+    command = ['abaqus', 'cae', 'noGUI=%s' % SCRIPT, '--',
+               '--splices', str(splices), '--bolts', str(bolts),
+               '--imperfection', str(imperfection)]
+    # abaqus is a batch file on Windows, so it needs the shell there
+    return subprocess.run(command, shell=(os.name == 'nt')).returncode
+
+
+def main():
+    cases = list(itertools.product(SPLICES, BOLTS, IMPERFECTIONS))
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        for case, code in zip(cases, pool.map(run_case, cases)):
+            status = 'ok' if code == 0 else 'failed (exit code %d)' % code
+            print('splices=%d bolts=%d imperfection=%s: %s' % (case + (status,)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Solver Resource Detection
+Description: Host CPU and GPU probes shared by the analysis scripts, so every
+             script sizes its Abaqus jobs by the same rules. Kept compatible
+             with the Python 2.7 kernel of older Abaqus releases.
+"""
+
+import multiprocessing
+import os
+import subprocess
+
+
+def _read_cpuinfo():
+    """Return (physical id, core id) pairs from /proc/cpuinfo, empty if unknown"""
+    cores = set()
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            physical_id = None
+            for line in cpuinfo:
+                if line.startswith('physical id'):
+                    physical_id = line.split(':')[1].strip()
+                elif line.startswith('core id'):
+                    cores.add((physical_id, line.split(':')[1].strip()))
+    except EnvironmentError:  # IOError on Python 2, OSError on Python 3
+        pass
+    return cores
+
+
+def logical_cpu_count():
+    """Return the number of logical CPUs, 1 if unknown"""
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def physical_core_count():
+    """Return the number of physical CPU cores.
+
+    Abaqus gains nothing from hyper-threads, so psutil and /proc/cpuinfo are
+    tried first; when neither is available, half the logical CPUs are assumed.
+    """
+    try:
+        import psutil
+        n = psutil.cpu_count(logical=False)
+        if n:
+            return n
+    except ImportError:
+        pass
+    cores = _read_cpuinfo()
+    if cores:
+        return len(cores)
+    return max(1, logical_cpu_count() // 2)
+
+
+def socket_count():
+    """Return the number of CPU sockets on this host, 1 if unknown"""
+    return max(len(set(pid for pid, _ in _read_cpuinfo())), 1)
+
+
+def cuda_available():
+    """Return True if an NVIDIA GPU is visible to the solver"""
+    if os.environ.get('CUDA_VISIBLE_DEVICES') in ('', '-1'):
+        return False
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.call(['nvidia-smi', '-L'], stdout=devnull,
+                                   stderr=devnull) == 0
+    except EnvironmentError:
+        return False
@@ -2,8 +2,37 @@
 """
 清理辅助函数：用于在算例完成后删除工作目录
 """
+import atexit
+import logging
+import logging.handlers
 import os
 import shutil
+import stat
+import sys
+from multiprocessing.pool import ThreadPool
+
+try:
+    from os import scandir
+except ImportError:  # Python 2.7（旧版Abaqus内核）没有os.scandir
+    scandir = None
+
+# 日志：批量运行时逐行print会频繁刷新stdout，这里先缓存到内存，
+# 满1024条、出现ERROR、调用flush_log()或程序退出时一次性写出
+logger = logging.getLogger('abq.cleanup')
+if not logger.handlers:
+    logger.addHandler(logging.handlers.MemoryHandler(
+        capacity=1024, flushLevel=logging.ERROR,
+        target=logging.StreamHandler(sys.stdout)))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+def flush_log():
+    """写出缓存的清理日志"""
+    for handler in logger.handlers:
+        handler.flush()
+
+# Abaqus/CAE退出时不一定调用logging.shutdown，这里显式注册
+atexit.register(flush_log)
 
 # 配置选项（从主脚本导入或定义）
 try:
@@ -11,7 +40,16 @@ try:
 except:
     KEEP_WORK_FILES = False  # 默认不保留
 
-def cleanup_case_work_dir(case_work_dir, case_results_dir, min_png_count=1, keep_work_files=None):
+def _result_file_names(results_dir):
+    """一次遍历结果目录，返回其中的文件名集合（目录不存在时为空集合）"""
+    if not os.path.isdir(results_dir):
+        return set()
+    if scandir is None:
+        return set(os.listdir(results_dir))
+    # DirEntry自带文件类型信息，无需对每个文件再stat
+    return set(entry.name for entry in scandir(results_dir) if entry.is_file())
+
+def cleanup_case_work_dir(case_work_dir, case_results_dir, min_png_count=1, keep_work_files=None, remove=True):
     """
     清理算例工作目录（仅在结果验证成功时）
     
@@ -19,51 +57,92 @@ def cleanup_case_work_dir(case_work_dir, case_results_dir, min_png_count=1, keep
         case_work_dir: 工作目录路径（将被删除）
         case_results_dir: 结果目录路径（用于验证）
         min_png_count: 最少PNG文件数量（默认1）
+        remove: False时只做验证，由调用方收集后用remove_work_dirs批量删除
     
     返回:
-        bool: 是否成功清理
+        bool: 是否成功清理（remove=False时：是否可以清理）
     """
     if keep_work_files is None:
         keep_work_files = KEEP_WORK_FILES
     
     if keep_work_files:
-        print("[cleanup] KEEP_WORK_FILES=True, skipping cleanup of %s" % case_work_dir)
+        logger.info("[cleanup] KEEP_WORK_FILES=True, skipping cleanup of %s" % case_work_dir)
         return False
     
-    # 验证结果文件是否存在
-    buckle_csv = os.path.join(case_results_dir, 'buckling_eigen.csv')
-    riks_csv = os.path.join(case_results_dir, 'riks_curve.csv')
-    
-    csv_ok = os.path.exists(buckle_csv) and os.path.exists(riks_csv)
+    # 验证结果文件是否存在（CSV和PNG共用一次目录遍历）
+    names = _result_file_names(case_results_dir)
+    buckle_ok = 'buckling_eigen.csv' in names
+    riks_ok = 'riks_curve.csv' in names
+    csv_ok = buckle_ok and riks_ok
     
     # 检查PNG文件
-    png_count = 0
-    if os.path.exists(case_results_dir):
-        png_files = [f for f in os.listdir(case_results_dir) if f.endswith('.png')]
-        png_count = len(png_files)
+    png_count = sum(1 for name in names if name.endswith('.png'))
     
     if not csv_ok:
-        print("[cleanup] WARNING: CSV files missing, NOT cleaning up work dir")
-        print("[cleanup]   buckle_csv exists: %s" % os.path.exists(buckle_csv))
-        print("[cleanup]   riks_csv exists: %s" % os.path.exists(riks_csv))
+        logger.warning("[cleanup] WARNING: CSV files missing, NOT cleaning up work dir")
+        logger.info("[cleanup]   buckle_csv exists: %s" % buckle_ok)
+        logger.info("[cleanup]   riks_csv exists: %s" % riks_ok)
         return False
     
     if png_count < min_png_count:
-        print("[cleanup] WARNING: PNG count (%d) < minimum (%d), NOT cleaning up work dir" % 
+        logger.warning("[cleanup] WARNING: PNG count (%d) < minimum (%d), NOT cleaning up work dir" % 
               (png_count, min_png_count))
         return False
     
     # 验证通过，删除工作目录
+    if not remove:
+        return os.path.exists(case_work_dir)
     if os.path.exists(case_work_dir):
-        try:
-            print("[cleanup] Removing work directory: %s" % case_work_dir)
-            shutil.rmtree(case_work_dir)
-            print("[cleanup] Successfully removed work directory")
+        logger.info("[cleanup] Removing work directory: %s" % case_work_dir)
+        if _remove_tree(case_work_dir):
+            logger.info("[cleanup] Successfully removed work directory")
             return True
-        except Exception as e:
-            print("[cleanup] ERROR: Failed to remove work directory: %s" % str(e))
-            return False
+        logger.error("[cleanup] ERROR: Failed to remove work directory: %s" % case_work_dir)
+        return False
     else:
-        print("[cleanup] Work directory does not exist: %s" % case_work_dir)
+        logger.info("[cleanup] Work directory does not exist: %s" % case_work_dir)
         return False
 
+def _on_rmtree_error(func, path, exc_info):
+    """rmtree的onerror回调：去掉只读属性后重试（Windows下只读文件无法直接删除），仍失败则记录日志"""
+    try:
+        os.chmod(path, stat.S_IWRITE)
+        func(path)
+    except OSError as e:
+        logger.error("[cleanup] ERROR: Failed to remove %s: %s" % (path, str(e)))
+
+def _remove_tree(path):
+    """删除单个目录，返回是否已删除"""
+    shutil.rmtree(path, onerror=_on_rmtree_error)
+    return not os.path.exists(path)
+
+def remove_work_dirs(dirs, max_workers=8):
+    """
+    并行删除多个算例工作目录（删除是IO密集型，线程在系统调用期间释放GIL）
+    
+    参数:
+        dirs: 待删除的工作目录列表（调用前应已通过cleanup_case_work_dir验证）
+        max_workers: 并行删除线程数
+    
+    返回:
+        int: 成功删除的目录数
+    """
+    try:
+        dirs = [d for d in dirs if os.path.exists(d)]
+        if not dirs:
+            return 0
+        logger.info("[cleanup] Removing %d work directories" % len(dirs))
+        pool = ThreadPool(min(max_workers, len(dirs)))
+        try:
+            removed = pool.map(_remove_tree, dirs)
+        finally:
+            pool.close()
+            pool.join()
+        for d, ok in zip(dirs, removed):
+            if not ok:
+                logger.error("[cleanup] ERROR: Failed to remove work directory: %s" % d)
+        logger.info("[cleanup] Successfully removed %d/%d work directories" % (sum(removed), len(dirs)))
+        return sum(removed)
+    finally:
+        # 批量删除结束时（包括无目录可删、出错时）一次性写出缓存的日志
+        flush_log()
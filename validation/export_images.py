@@ -43,10 +43,25 @@ Three views:
 """
 from abaqus import *
 from abaqusConstants import *
+import atexit
 import os
+import re
 import sys
 import time
 import shutil
+import subprocess
+
+import numpy as np
+
+try:
+    from os import scandir
+except ImportError:  # Python 2.7 (older Abaqus kernels) has no os.scandir
+    scandir = None
+
+try:
+    from PIL import Image  # Optional: offline PNG encoding of raw TIFF captures
+except ImportError:
+    Image = None
 
 # -----------------------------
 # === Research toggles (defaults implement Priority 1+2) ===
@@ -76,13 +91,15 @@ LPF_SMOOTH_WINDOW = 3  # Light smoothing window (1 = no smoothing, recommend 3 o
 # Timing parameters (GUI mode needs longer wait times to ensure rendering completes)
 # -----------------------------
 WAIT_AFTER_OPEN_SEC   = 3.0   # GUI mode: ODB opening and viewport initialization need longer time
-WAIT_AFTER_SETFRAME   = 0.5   # GUI mode: Frame switching rendering needs time
-WAIT_AFTER_SETVIEW    = 0.3   # GUI mode: View switching rendering needs time
-WAIT_AFTER_SETVAR     = 0.5   # GUI mode: Variable setting and rendering needs time
-WAIT_AFTER_PRINT_SEC  = 2.0   # GUI mode: PNG writing needs longer time (especially NAS, increased to 2 sec)
+WAIT_AFTER_PRINT_SEC  = 2.0   # GUI/NAS: Extra wait before the second check when a PNG did not appear
 WAIT_BEFORE_CLOSE_SEC = 2.0   # GUI mode: Wait longer before closing to ensure all operations complete
 PRINT_TIMEOUT_SEC     = 60.0  # GUI/NAS: PNG file appearance wait time (increased to 60 sec, NAS writes slowly)
 
+# Batch mode: cases exported concurrently, each in its own "abaqus viewer" process
+# (one license token each); 1 = export all cases sequentially in this process
+MAX_PARALLEL_EXPORTS = 2
+EXPORT_POLL_SEC = 5.0
+
 # Long path/NAS slow write: Output to short path first, then copy back to target directory
 MAX_TARGET_PATH_LEN = 200
 SHORT_EXPORT_DIRNAME = "_png_tmp"
@@ -90,6 +107,11 @@ SHORT_EXPORT_DIRNAME = "_png_tmp"
 # PNG resolution (if Abaqus supports pngOptions)
 PNG_W, PNG_H = 1920, 1080
 
+# Capture as uncompressed TIFF and encode the PNGs in a thread pool at the end of
+# each export (only when PIL is importable; otherwise printToFile writes PNG directly)
+CAPTURE_RAW_TIFF = True
+PNG_ENCODE_WORKERS = 4
+
 # -----------------------------
 # Resolve working directories
 # -----------------------------
@@ -106,26 +128,35 @@ os.chdir(WORK_DIR)
 
 OUTPUT_DIR = os.path.join(WORK_DIR, "output")
 TEMP_DIR   = os.path.join(WORK_DIR, "temp_process")
-SHORT_DIR  = os.path.join(WORK_DIR, SHORT_EXPORT_DIRNAME)
+# Per process: parallel viewer processes capture files with the same basenames
+SHORT_DIR  = os.path.join(WORK_DIR, SHORT_EXPORT_DIRNAME, str(os.getpid()))
+
+# Directories already created or confirmed by _ensure_dir
+_MKDIR_CACHE = set()
 
 def _ensure_dir(d):
+    """Create d once per run (makedirs + EAFP, no exists probe); False if impossible."""
+    if not d or d in _MKDIR_CACHE:
+        return True
     try:
-        if d and (not os.path.exists(d)):
-            os.makedirs(d)
-    except:
-        pass
+        os.makedirs(d)
+    except OSError:
+        if not os.path.isdir(d):
+            return False
+    _MKDIR_CACHE.add(d)
+    return True
 
 _ensure_dir(SHORT_DIR)
 
 # -----------------------------
 # View / viewport helpers
 # -----------------------------
-def setup_export_viewport():
+def setup_export_viewport(name='Viewport: 1'):
     """Reuse the default viewport when possible (more stable in noGUI)."""
-    if 'Viewport: 1' in session.viewports.keys():
-        vp = session.viewports['Viewport: 1']
+    if name in session.viewports.keys():
+        vp = session.viewports[name]
     else:
-        vp = session.Viewport(name='Viewport: 1', origin=(0, 0), width=597, height=336)
+        vp = session.Viewport(name=name, origin=(0, 0), width=597, height=336)
 
     try:
         vp.makeCurrent()
@@ -146,6 +177,48 @@ def setup_export_viewport():
 
     return vp
 
+# One viewport per displayed ODB, keyed like _OPEN_ODBS; revisiting an ODB only
+# makes its viewport current instead of rebuilding the display list
+_VP_BY_ODB = {}
+
+def _get_vp_for(odb_session, path_abs):
+    key = os.path.normcase(path_abs)
+    vp = _VP_BY_ODB.get(key)
+    if vp is None:
+        # First ODB keeps the default viewport, later ones get their own
+        name = 'Viewport: 1' if not _VP_BY_ODB else 'Export: %d' % len(_VP_BY_ODB)
+        vp = setup_export_viewport(name)
+        vp.setValues(displayedObject=odb_session)
+        _VP_BY_ODB[key] = vp
+    else:
+        try:
+            vp.makeCurrent()
+        except:
+            pass
+    return vp
+
+def _release_viewports():
+    """Delete the extra export viewports and forget the ODB -> viewport mapping."""
+    for vp in _VP_BY_ODB.values():
+        try:
+            if vp.name != 'Viewport: 1':
+                del session.viewports[vp.name]
+        except:
+            pass
+    _VP_BY_ODB.clear()
+    _APPLIED_VIEW.clear()  # Viewport names are reused by the next case
+
+def _sync(vp):
+    """Block until the viewport has redrawn with its current state.
+
+    forceRefresh is synchronous, so one call right before printToFile
+    replaces fixed sleeps after every frame/view/variable change.
+    """
+    try:
+        vp.forceRefresh()
+    except:
+        time.sleep(0.1)
+
 def set_legend(vp, show):
     """Set legend visibility."""
     try:
@@ -153,8 +226,52 @@ def set_legend(vp, show):
     except:
         pass
 
-def apply_view(vp, view_name):
-    """Apply a predefined view using Abaqus's view rotation methods."""
+# Predefined views: setViewpoint arguments, and (x, y, z) rotations from Iso for the fallback
+_VIEW_CAMERAS = {
+    'WebFront': dict(viewVector=(1, 0, 0), cameraUpVector=(0, 0, 1)),  # X direction looking at YZ plane
+    'Side':     dict(viewVector=(0, 1, 0), cameraUpVector=(0, 0, 1)),  # Y direction looking at XZ plane
+    'Iso':      dict(viewVector=(1, 1, 1), cameraUpVector=(0, 0, 1)),  # Isometric view
+}
+_VIEW_ROTATIONS = {'WebFront': (0, 90, 0), 'Side': (90, 0, 0)}
+
+# Fitted camera per (odb, step, frame, view); extents only change with the frame
+_VIEW_CACHE = {}
+_CAMERA_KEYS = ('cameraPosition', 'cameraTarget', 'cameraUpVector',
+                'viewOffsetX', 'viewOffsetY', 'width', 'height')
+
+# Key of the camera each viewport currently shows; a repeated key is a no-op
+_APPLIED_VIEW = {}
+
+def _store_view(vp, cache_key):
+    if cache_key is None:
+        return
+    try:
+        _VIEW_CACHE[cache_key] = dict((k, getattr(vp.view, k)) for k in _CAMERA_KEYS)
+        _APPLIED_VIEW[vp.name] = cache_key
+    except:
+        pass
+
+def apply_view(vp, view_name, cache_key=None):
+    """Apply a predefined view using Abaqus's view rotation methods.
+
+    With cache_key, the fitted camera is stored and restored on the next call
+    with the same key, skipping setViewpoint and fitView.
+    """
+    if cache_key is not None and _APPLIED_VIEW.get(vp.name) == cache_key:
+        return True  # Same frame and view as the last call: camera is still fitted
+    _APPLIED_VIEW.pop(vp.name, None)
+    cam = _VIEW_CACHE.get(cache_key) if cache_key is not None else None
+    if cam is not None:
+        try:
+            vp.view.setValues(**cam)
+            _APPLIED_VIEW[vp.name] = cache_key
+            return True
+        except:
+            _VIEW_CACHE.pop(cache_key, None)
+
+    params = _VIEW_CAMERAS.get(view_name)
+    if params is None:
+        return False
     try:
         # Reset to standard view first
         vp.view.setValues(nearPlane=10, farPlane=1000, width=500, height=500,
@@ -162,51 +279,70 @@ def apply_view(vp, view_name):
                           cameraUpVector=(0, 1, 0))
     except:
         pass
-    
+
     try:
-        if view_name == 'WebFront':
-            # Front view: X direction looking at YZ plane
-            vp.view.setViewpoint(viewVector=(1, 0, 0), cameraUpVector=(0, 0, 1))
-        elif view_name == 'Side':
-            # Side view: Y direction looking at XZ plane  
-            vp.view.setViewpoint(viewVector=(0, 1, 0), cameraUpVector=(0, 0, 1))
-        elif view_name == 'Iso':
-            # Isometric view
-            vp.view.setViewpoint(viewVector=(1, 1, 1), cameraUpVector=(0, 0, 1))
-        else:
-            return False
-        
-        time.sleep(WAIT_AFTER_SETVIEW)
+        vp.view.setViewpoint(**params)
         vp.view.fitView()  # Auto-scale to fit
-        time.sleep(0.2)
-        return True
     except Exception as e:
         print("[apply_view] setViewpoint failed for %s: %s" % (view_name, str(e)))
-        # Fallback method: use rotate
-        try:
-            vp.view.setValues(session.views['Iso'])
-            if view_name == 'WebFront':
-                vp.view.rotate(xAngle=0, yAngle=90, zAngle=0, mode=TOTAL)
-            elif view_name == 'Side':
-                vp.view.rotate(xAngle=90, yAngle=0, zAngle=0, mode=TOTAL)
-            # Iso keeps default
-            time.sleep(WAIT_AFTER_SETVIEW)
-            vp.view.fitView()
-            return True
-        except Exception as e2:
-            print("[apply_view] rotate fallback also failed: %s" % str(e2))
+        if not _apply_view_by_rotation(vp, view_name):
             return False
+    _store_view(vp, cache_key)
+    return True
 
-def get_step_with_most_frames(odb_access):
+def _apply_view_by_rotation(vp, view_name):
+    """Fallback for releases without setViewpoint: rotate from the Iso view."""
+    try:
+        vp.view.setValues(session.views['Iso'])
+        angles = _VIEW_ROTATIONS.get(view_name)
+        if angles is not None:  # Iso keeps default
+            vp.view.rotate(xAngle=angles[0], yAngle=angles[1], zAngle=angles[2], mode=TOTAL)
+        vp.view.fitView()
+        return True
+    except Exception as e:
+        print("[apply_view] rotate fallback also failed: %s" % str(e))
+        return False
+
+# Session ODBs opened by this script, keyed by normalized absolute path
+_OPEN_ODBS = {}
+
+def _get_or_open_odb(path_abs):
+    """Return the session ODB for path_abs, opening it on first use (O(1) lookup)."""
+    key = os.path.normcase(path_abs)
+    odb = _OPEN_ODBS.get(key)
+    if odb is None:
+        if path_abs in session.odbs.keys():
+            odb = session.odbs[path_abs]
+            print("[odb] Found existing ODB in session.odbs: %s" % path_abs)
+        else:
+            odb = session.openOdb(name=path_abs)
+            time.sleep(WAIT_AFTER_OPEN_SEC)
+        _OPEN_ODBS[key] = odb
+    return odb
+
+def _close_case_odbs(odb_paths):
+    """Release the export viewports and close the given ODBs after a case."""
+    _release_viewports()
+    for path in odb_paths:
+        odb = _OPEN_ODBS.pop(os.path.normcase(os.path.abspath(path)), None)
+        if odb is None:
+            continue
+        try:
+            odb.close()
+        except Exception as e:
+            print("[odb] Error closing ODB %s: %s" % (path, str(e)))
+    _VIEW_CACHE.clear()
+
+def get_step_with_most_frames(odb):
     """Find step with most frames."""
     best_step = None
     max_frames = 0
-    for step_name in odb_access.steps.keys():
-        n_frames = len(odb_access.steps[step_name].frames)
+    for step_name in odb.steps.keys():
+        n_frames = len(odb.steps[step_name].frames)
         if n_frames > max_frames:
             max_frames = n_frames
             best_step = step_name
-    return best_step or list(odb_access.steps.keys())[0]
+    return best_step or list(odb.steps.keys())[0]
 
 def _safe_target_path(path):
     final_path = os.path.abspath(path)
@@ -216,37 +352,131 @@ def _safe_target_path(path):
     export_path = os.path.join(SHORT_DIR, base)
     return export_path, final_path, True
 
+def _file_ready(path):
+    """File exists and is non-empty.
+
+    open + fstat instead of stat: on NFS, open is a close-to-open consistency
+    point, so the size is fresh rather than a cached attribute.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        return os.fstat(fd).st_size > 0
+    finally:
+        os.close(fd)
+
 def _wait_file(path, timeout_sec=PRINT_TIMEOUT_SEC):
+    # printToFile is synchronous, so the file is normally there already;
+    # only poll (with exponential backoff, capped at 1 s) when it is not,
+    # e.g. on a slow NAS; polling faster than its attribute cache gains nothing
+    if _file_ready(path):
+        return True
     t0 = time.time()
+    sleep_time = 0.25
     while time.time() - t0 < timeout_sec:
-        try:
-            if os.path.exists(path) and os.path.getsize(path) > 0:
-                return True
-        except:
-            pass
-        time.sleep(0.1)
+        time.sleep(sleep_time)
+        if _file_ready(path):
+            return True
+        sleep_time = min(sleep_time * 2, 1.0)
     return False
 
-def print_png(vp, target_png_path):
-    export_path, final_path, need_copy = _safe_target_path(target_png_path)
-    _ensure_dir(os.path.dirname(final_path))
-    
-    # Ensure directory exists (Python 2.7 compatible)
+# PNGs written to SHORT_DIR that still have to be moved to their long target path
+_PENDING_COPIES = []
+# Raw TIFF captures (tif_path, png_path) still to be encoded to PNG
+_COMPRESS_QUEUE = []
+# (final png path, reason) of captures that did not end up as a PNG at their
+# final path; reported in the case status (_EXPORT_DONE.txt / batch log)
+_FAILED_IMAGES = []
+
+def _encode_png(item):
+    tif_path, png_path = item
     try:
-        export_dir = os.path.dirname(export_path)
-        if export_dir and not os.path.exists(export_dir):
-            os.makedirs(export_dir)
-        if need_copy:
-            final_dir = os.path.dirname(final_path)
-            if final_dir and not os.path.exists(final_dir):
-                os.makedirs(final_dir)
+        Image.open(tif_path).save(png_path, format='PNG')
+        os.remove(tif_path)
+        return None
     except Exception as e:
-        print("[print_png] Failed to create directory: %s" % str(e))
-        return False
+        return (tif_path, png_path, str(e))
+
+def compress_pending_captures():
+    """Encode queued TIFF captures to PNG concurrently (zlib releases the GIL)."""
+    if not _COMPRESS_QUEUE:
+        return True
+    items = list(_COMPRESS_QUEUE)
+    del _COMPRESS_QUEUE[:]
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(max(1, min(PNG_ENCODE_WORKERS, len(items))))
+    try:
+        errors = [e for e in pool.map(_encode_png, items) if e]
+    finally:
+        pool.close()
+        pool.join()
+    for tif_path, png_path, reason in errors:
+        print("[print_png] PNG encode failed: %s (%s)" % (png_path, reason))
+        # Keep the raw capture: it is moved to the final directory instead
+        final_png = png_path
+        for i, (src, dst) in enumerate(_PENDING_COPIES):
+            if src == png_path:
+                final_png = dst
+                _PENDING_COPIES[i] = (tif_path, os.path.splitext(dst)[0] + '.tif')
+        _FAILED_IMAGES.append((final_png, "PNG encode failed, TIFF kept: %s" % reason))
+    print("[print_png] Encoded %d PNG(s) from raw captures" % (len(items) - len(errors)))
+    return not errors
+
+def _remove_short_dir():
+    """Remove this process's (by now empty) capture directory."""
+    try:
+        os.rmdir(SHORT_DIR)
+    except OSError:
+        pass
+
+def flush_pending_copies():
+    """Encode queued captures, then move PNGs from SHORT_DIR to their final paths."""
+    ok = compress_pending_captures()
+    while _PENDING_COPIES:
+        src, dst = _PENDING_COPIES.pop(0)
+        try:
+            try:
+                if os.path.exists(dst):
+                    os.remove(dst)
+                os.rename(src, dst)
+            except OSError:
+                shutil.move(src, dst)  # Different volume: copy once, then delete
+            print("[print_png] Moved to final path: %s" % dst)
+        except Exception as e:
+            ok = False
+            print("[print_png] Move to final path failed: %s (%s)" % (dst, str(e)))
+            _FAILED_IMAGES.append((dst, "move from %s failed: %s" % (src, str(e))))
+    return ok
+
+# Captures still queued when the process exits early are encoded/moved anyway,
+# so they are not stranded in SHORT_DIR
+atexit.register(flush_pending_copies)
 
-    print("[print_png] Exporting to: %s" % export_path)
+def print_png(vp, target_png_path):
+    """Capture the viewport for target_png_path; True once the capture exists.
+
+    Raw TIFF captures are encoded and long-path files moved by
+    flush_pending_copies, whose result (and _FAILED_IMAGES) is the final word.
+    """
+    export_path, final_path, need_copy = _safe_target_path(target_png_path)
+
+    # Ensure directories exist (cached: one makedirs per directory per run)
+    for d in (os.path.dirname(final_path), os.path.dirname(export_path)):
+        if not _ensure_dir(d):
+            print("[print_png] Failed to create directory: %s" % d)
+            return False
+
+    # TIFF capture skips the in-process PNG encode; the PNG is written later
+    raw_capture = CAPTURE_RAW_TIFF and Image is not None
+    capture_path = os.path.splitext(export_path)[0] + '.tif' if raw_capture else export_path
+
+    print("[print_png] Exporting to: %s" % capture_path)
+    _sync(vp)
     try:
-        session.printToFile(fileName=export_path, format=PNG, canvasObjects=(vp,))
+        session.printToFile(fileName=capture_path, format=TIFF if raw_capture else PNG,
+                            canvasObjects=(vp,))
         print("[print_png] printToFile called successfully")
     except Exception as e:
         print("[print_png] printToFile failed: %s" % str(e))
@@ -254,11 +484,8 @@ def print_png(vp, target_png_path):
         traceback.print_exc()
         return False
 
-    # GUI mode: needs longer wait time
-    time.sleep(WAIT_AFTER_PRINT_SEC)
-    
     # Verify file was successfully written (check actual path used first)
-    check_path = export_path if need_copy else final_path
+    check_path = capture_path
     if not _wait_file(check_path, timeout_sec=PRINT_TIMEOUT_SEC):
         print("[print_png] PNG not created or empty after timeout: %s" % check_path)
         # Wait once more and retry
@@ -267,19 +494,14 @@ def print_png(vp, target_png_path):
             print("[print_png] PNG still not available: %s" % check_path)
             return False
     
-    print("[print_png] PNG file confirmed: %s (size: %d bytes)" % 
-          (check_path, os.path.getsize(check_path) if os.path.exists(check_path) else 0))
+    print("[print_png] Capture confirmed: %s (size: %d bytes)" %
+          (check_path, os.path.getsize(check_path)))
 
+    if raw_capture:
+        _COMPRESS_QUEUE.append((capture_path, export_path))
     if need_copy:
-        try:
-            shutil.copy2(export_path, final_path)
-            print("[print_png] Copied to final path: %s" % final_path)
-            # Verify final file
-            if not _wait_file(final_path, timeout_sec=5):
-                print("[print_png] WARNING: Final file not verified after copy")
-        except Exception as e:
-            print("[print_png] Copy back failed: %s" % str(e))
-            return False
+        # Moved to the long target path in one pass at the end of the export
+        _PENDING_COPIES.append((export_path, final_path))
 
     return True
 
@@ -292,7 +514,13 @@ def _export_with_legend(vp, filename_base):
 # -----------------------------
 # Peak LPF frame finder (Priority 1)
 # -----------------------------
-def find_peak_lpf_frame_index(odb_access, step_name,
+def _nearest_frame(frames, t_target):
+    """Index of the frame whose frameValue is closest to t_target (first one on ties)."""
+    # Each frameValue access crosses into the ODB API, so read them all once
+    fv = np.fromiter((fr.frameValue for fr in frames), dtype=np.float64, count=len(frames))
+    return int(np.argmin(np.abs(fv - t_target)))
+
+def find_peak_lpf_frame_index(odb, step_name,
                               drop_ratio=LPF_DROP_RATIO,
                               persist_n=LPF_DROP_PERSIST_N,
                               min_peak_frac=LPF_MIN_PEAK_FRAC,
@@ -310,94 +538,71 @@ def find_peak_lpf_frame_index(odb_access, step_name,
     Return (frame_index, peak_lpf_original, peak_time, peak_type)
       peak_type: 'peak_before_drop' or 'global_max'
     """
-    step = odb_access.steps[step_name]
+    step = odb.steps[step_name]
     last_frame = len(step.frames) - 1
     if last_frame < 0:
         return (-1, None, None, None)
 
     # ---- find LPF history (longest one) ----
     best_data = None
-    for rname, region in step.historyRegions.items():
+    best_len = 0
+    # EAFP: one repository lookup per region instead of keys() + __getitem__
+    for region in step.historyRegions.values():
         try:
-            if 'LPF' in region.historyOutputs.keys():
-                data = region.historyOutputs['LPF'].data
-                if data and (best_data is None or len(data) > len(best_data)):
-                    best_data = data
+            data = region.historyOutputs['LPF'].data
         except:
-            pass
+            continue
+        if len(data) > best_len:
+            best_data, best_len = data, len(data)
     if not best_data:
         return (last_frame, None, None, None)
 
     # ---- build arrays ----
-    t = [tv[0] for tv in best_data]
-    y = [tv[1] for tv in best_data]
+    # One conversion of the ((t, lpf), ...) tuple; t and y are column views
+    # used by every step below, the history is never iterated in Python again
+    hist = np.asarray(best_data, dtype=np.float64)
+    t, y = hist[:, 0], hist[:, 1]
 
     # Main sign: Compression may be negative, use larger magnitude side as positive
-    y_max = max(y)
-    y_min = min(y)
-    sign_ref = 1.0 if (y_max >= abs(y_min)) else -1.0
-    y_eff = [sign_ref * v for v in y]  # For finding peaks/drops (ensure main direction is positive)
+    sign_ref = 1.0 if (y.max() >= abs(y.min())) else -1.0
+    y_eff = sign_ref * y  # For finding peaks/drops (ensure main direction is positive)
 
     # ---- optional smoothing (very light) ----
+    # Centered moving average over 2*half+1 points, averaging only the points
+    # inside the history at both ends
     if smooth_win and smooth_win > 1 and len(y_eff) >= smooth_win:
         half = smooth_win // 2
-        y_sm = []
-        for i in range(len(y_eff)):
-            a = max(0, i - half)
-            b = min(len(y_eff), i + half + 1)
-            y_sm.append(sum(y_eff[a:b]) / float(b - a))
-        y_use = y_sm
+        kernel = np.ones(2 * half + 1)
+        n = len(y_eff)
+        y_use = (np.convolve(y_eff, kernel)[half:half + n] /
+                 np.convolve(np.ones(n), kernel)[half:half + n])
     else:
         y_use = y_eff
 
     # ---- compute global peak (for threshold) ----
-    global_peak = max(y_use) if y_use else 0.0
+    global_peak = y_use.max()
     if global_peak <= 1e-6:
         return (last_frame, None, None, None)
     
     min_peak_val = min_peak_frac * global_peak
 
     # ---- find local peaks (improved: use local peaks instead of running max) ----
-    # Local peak: y[i] >= y[i-1] and y[i] >= y[i+1]
-    local_peaks = []
-    for i in range(1, len(y_use) - 1):
-        if y_use[i] >= y_use[i-1] and y_use[i] >= y_use[i+1]:
-            if y_use[i] >= min_peak_val:  # Must reach minimum peak threshold
-                local_peaks.append(i)
-    
-    # If no local peaks, fallback to global max
-    if not local_peaks:
-        chosen_i = max(range(len(y_use)), key=lambda k: y_use[k])
-        peak_time = t[chosen_i]
-        peak_lpf_original = y[chosen_i]
-        frames = step.frames
-        best_i = last_frame
-        best_err = 1e100
-        for i, fr in enumerate(frames):
-            try:
-                err = abs(fr.frameValue - peak_time)
-                if err < best_err:
-                    best_err = err
-                    best_i = i
-            except:
-                pass
-        return (best_i, peak_lpf_original, peak_time, 'global_max')
+    # Local peak: y[i] >= y[i-1] and y[i] >= y[i+1], and must reach minimum peak threshold
+    mid = y_use[1:-1]
+    local_peaks = np.nonzero((mid >= y_use[:-2]) & (mid >= y_use[2:]) &
+                             (mid >= min_peak_val))[0] + 1
 
     # ---- helper: check sustained drop after a peak ----
+    persist_n = max(1, int(persist_n))
+
     def has_sustained_drop_after_peak(i_peak):
-        peak_val = y_use[i_peak]
-        threshold = drop_ratio * peak_val
-        consecutive_below = 0
-        
-        for j in range(i_peak + 1, len(y_use)):
-            if y_use[j] <= threshold:
-                consecutive_below += 1
-                if consecutive_below >= persist_n:
-                    return True  # Found sustained drop
-            else:
-                consecutive_below = 0  # Reset counter
-        
-        return False
+        # >= persist_n consecutive points at or below the threshold after the peak:
+        # a window sum over the prefix count of "below" points equals persist_n
+        below = y_use[i_peak + 1:] <= drop_ratio * y_use[i_peak]
+        if len(below) < persist_n:
+            return False
+        counts = np.concatenate(([0], np.cumsum(below)))
+        return bool(np.any(counts[persist_n:] - counts[:-persist_n] == persist_n))
 
     # ---- choose earliest peak with sustained drop ----
     chosen_i = None
@@ -405,32 +610,19 @@ def find_peak_lpf_frame_index(odb_access, step_name,
     
     for i_peak in local_peaks:
         if has_sustained_drop_after_peak(i_peak):
-            chosen_i = i_peak
+            chosen_i = int(i_peak)
             peak_type = 'peak_before_drop'
             break
     
-    # ---- fallback: global max ----
+    # ---- fallback: global max (also when there are no local peaks) ----
     if chosen_i is None:
-        chosen_i = max(range(len(y_use)), key=lambda k: y_use[k])
+        chosen_i = int(np.argmax(y_use))
         peak_type = 'global_max'
 
-    peak_time = t[chosen_i]
-    peak_lpf_original = y[chosen_i]  # Keep original sign for more intuitive output
+    peak_time = float(t[chosen_i])
+    peak_lpf_original = float(y[chosen_i])  # Keep original sign for more intuitive output
 
-    # ---- map time -> nearest frame ----
-    frames = step.frames
-    best_i = last_frame
-    best_err = 1e100
-    for i, fr in enumerate(frames):
-        try:
-            err = abs(fr.frameValue - peak_time)
-            if err < best_err:
-                best_err = err
-                best_i = i
-        except:
-            pass
-
-    return (best_i, peak_lpf_original, peak_time, peak_type)
+    return (_nearest_frame(step.frames, peak_time), peak_lpf_original, peak_time, peak_type)
 
 # -----------------------------
 # Export routines
@@ -446,117 +638,67 @@ def export_buckling_images(odb_path, output_dir, n_modes=1, views=None, scale=80
     print("[buckling] Opening ODB: %s" % odb_path)
     odb_path_abs = os.path.abspath(odb_path)
 
-    # Integrate v2 advantages: more robust ODB opening logic
-    odb_session = None
-    for key in list(session.odbs.keys()):
-        if odb_path_abs in key or key in odb_path_abs:
-            odb_session = session.odbs[key]
-            print("[buckling] Found existing ODB in session.odbs: %s" % key)
-            break
-    
-    if odb_session is None:
-        session.openOdb(name=odb_path_abs)
-        time.sleep(WAIT_AFTER_OPEN_SEC)
-        all_keys = list(session.odbs.keys())
-        print("[buckling] session.odbs keys after open: %s" % str(all_keys))
-        if odb_path_abs in all_keys:
-            odb_session = session.odbs[odb_path_abs]
-        elif len(all_keys) > 0:
-            for key in all_keys:
-                if odb_path_abs in key or os.path.basename(odb_path_abs) in key:
-                    odb_session = session.odbs[key]
-                    print("[buckling] Matched ODB by key: %s" % key)
-                    break
-            if odb_session is None:
-                odb_session = list(session.odbs.values())[-1]
-                print("[buckling] Using last ODB in session.odbs")
-        else:
-            raise Exception("Could not find ODB in session.odbs after opening")
-
-    from odbAccess import openOdb
-    odb_access = openOdb(path=odb_path_abs, readOnly=True)
-    step_name = get_step_with_most_frames(odb_access)
-    st = odb_access.steps[step_name]
+    odb_session = _get_or_open_odb(odb_path_abs)
+    # The session ODB exposes the same steps/frames API; no second odbAccess open
+    step_name = get_step_with_most_frames(odb_session)
+    st = odb_session.steps[step_name]
     available = max(0, len(st.frames) - 1)
     n_modes = min(int(n_modes), available)
     if n_modes <= 0:
         print("[buckling] No modes available: frames=%d" % len(st.frames))
-        odb_access.close()
         return False
 
-    vp = setup_export_viewport()
-    time.sleep(0.2)  # Wait for viewport to be ready
-    vp.setValues(displayedObject=odb_session)
-    time.sleep(0.3)  # Wait for displayedObject setup to complete (critical: GUI needs time)
+    vp = _get_vp_for(odb_session, odb_path_abs)
+    odb_display = vp.odbDisplay  # Resolved once, used for every frame/variable change
 
-    vp.odbDisplay.display.setValues(plotState=(CONTOURS_ON_DEF,))
-    time.sleep(WAIT_AFTER_SETVIEW)
-    vp.odbDisplay.commonOptions.setValues(deformationScaling=UNIFORM,
-                                          uniformScaleFactor=float(scale),
-                                          visibleEdges=FEATURE)
-    time.sleep(WAIT_AFTER_SETVIEW)
+    odb_display.display.setValues(plotState=(CONTOURS_ON_DEF,))
+    odb_display.commonOptions.setValues(deformationScaling=UNIFORM,
+                                        uniformScaleFactor=float(scale),
+                                        visibleEdges=FEATURE)
 
     ok = True
     exported = 0
 
     print("[buckling] n_modes=%d, views=%s, step=%s" % (n_modes, str(views), step_name))
 
-    # --- Var A: U magnitude (default, keep old naming) ---
-    try:
-        vp.odbDisplay.setPrimaryVariable(variableLabel='U', outputPosition=NODAL,
-                                         refinement=(INVARIANT, 'Magnitude'))
-        print("[buckling] Set primary variable U Magnitude OK")
-    except Exception as e:
-        print("[buckling] ERROR setting primary variable: %s" % str(e))
-        return False
-    time.sleep(WAIT_AFTER_SETVAR)  # GUI mode: wait for variable setting and rendering
+    # Variables exported per (mode, view): (variableLabel, position, refinement, filename template)
+    # Var A: U magnitude (default, keep old naming); Var B: U1 (Priority 2)
+    variables = [('U', NODAL, (INVARIANT, 'Magnitude'), prefix + "_%(view)s_mode%(mode)02d")]
+    if EXPORT_BUCKLING_U1:
+        variables.append(('U', NODAL, (COMPONENT, 'U1'), "buckling_U1_%(view)s_mode%(mode)02d"))
 
-    for v in views:
-        print("[buckling] Applying view: %s" % v)
-        if not apply_view(vp, v):
-            print("[buckling] WARNING: apply_view failed for %s" % v)
+    # Loop order frame -> view -> variable: each mode is set once and each view is
+    # fitted once per mode; switching the variable only re-contours the same picture
+    for m in range(1, n_modes + 1):
+        try:
+            odb_display.setFrame(step=step_name, frame=m)
+        except Exception as e:
+            ok = False
+            print("[buckling] ERROR setting frame %d: %s" % (m, str(e)))
             continue
-        for m in range(1, n_modes + 1):
+        for v in views:
             print("[buckling] Processing mode %d, view %s" % (m, v))
-            try:
-                vp.odbDisplay.setFrame(step=step_name, frame=m)
-                time.sleep(WAIT_AFTER_SETFRAME)
-                vp.view.fitView()
-            except Exception as e:
-                print("[buckling] ERROR setting frame: %s" % str(e))
+            if not apply_view(vp, v, (odb_path, step_name, m, v)):
+                print("[buckling] WARNING: apply_view failed for %s" % v)
                 continue
-            base = os.path.join(output_dir, "%s_%s_mode%02d" % (prefix, v, m))
-            print("[buckling] Exporting to: %s" % base)
-            if _export_with_legend(vp, base):
-                exported += 1
-                print("[buckling] Export OK for mode %d view %s" % (m, v))
-            else:
-                ok = False
-                print("[buckling] Export FAILED for mode %d view %s" % (m, v))
-
-    # --- Var B: U1 (Priority 2) ---
-    if EXPORT_BUCKLING_U1:
-        try:
-            vp.odbDisplay.setPrimaryVariable(variableLabel='U', outputPosition=NODAL,
-                                             refinement=(COMPONENT, 'U1'))
-            time.sleep(WAIT_AFTER_SETVAR)  # GUI mode: wait for variable setting and rendering
-            for v in views:
-                if not apply_view(vp, v):
+            for var_label, position, refinement, template in variables:
+                try:
+                    odb_display.setPrimaryVariable(variableLabel=var_label, outputPosition=position,
+                                                   refinement=refinement)
+                except Exception as e:
+                    ok = False
+                    print("[buckling] ERROR setting primary variable %s: %s" % (str(refinement), str(e)))
                     continue
-                for m in range(1, n_modes + 1):
-                    vp.odbDisplay.setFrame(step=step_name, frame=m)
-                    time.sleep(WAIT_AFTER_SETFRAME)
-                    vp.view.fitView()
-                    base = os.path.join(output_dir, "buckling_U1_%s_mode%02d" % (v, m))
-                    if _export_with_legend(vp, base):
-                        exported += 1
-                    else:
-                        ok = False
-        except Exception as e:
-            ok = False
-            print("[buckling] U1 export failed: %s" % str(e))
+                base = os.path.join(output_dir, template % {'view': v, 'mode': m})
+                print("[buckling] Exporting to: %s" % base)
+                if _export_with_legend(vp, base):
+                    exported += 1
+                else:
+                    ok = False
+                    print("[buckling] Export FAILED for mode %d view %s" % (m, v))
 
-    odb_access.close()
+    if not flush_pending_copies():
+        ok = False
     time.sleep(WAIT_BEFORE_CLOSE_SEC)
     
     # GUI mode: don't close session.odbs here, leave to main script for unified closing
@@ -575,67 +717,42 @@ def export_riks_images(odb_path, output_dir, views=None, scale=1.0):
     print("[riks] Opening ODB: %s" % odb_path)
     odb_path_abs = os.path.abspath(odb_path)
 
-    # Integrate v2 advantages: more robust ODB opening logic
-    odb_session = None
-    for key in list(session.odbs.keys()):
-        if odb_path_abs in key or key in odb_path_abs:
-            odb_session = session.odbs[key]
-            print("[riks] Found existing ODB in session.odbs: %s" % key)
-            break
-    
-    if odb_session is None:
-        session.openOdb(name=odb_path_abs)
-        time.sleep(WAIT_AFTER_OPEN_SEC)
-        all_keys = list(session.odbs.keys())
-        print("[riks] session.odbs keys after open: %s" % str(all_keys))
-        if odb_path_abs in all_keys:
-            odb_session = session.odbs[odb_path_abs]
-        elif len(all_keys) > 0:
-            for key in all_keys:
-                if odb_path_abs in key or os.path.basename(odb_path_abs) in key:
-                    odb_session = session.odbs[key]
-                    print("[riks] Matched ODB by key: %s" % key)
-                    break
-            if odb_session is None:
-                odb_session = list(session.odbs.values())[-1]
-                print("[riks] Using last ODB in session.odbs")
-        else:
-            raise Exception("Could not find ODB in session.odbs after opening")
-
-    from odbAccess import openOdb
-    odb_access = openOdb(path=odb_path_abs, readOnly=True)
-
-    step_name = get_step_with_most_frames(odb_access)
-    step = odb_access.steps[step_name]
+    odb_session = _get_or_open_odb(odb_path_abs)
+    # The session ODB also serves history/frame queries; no second odbAccess open
+    step_name = get_step_with_most_frames(odb_session)
+    step = odb_session.steps[step_name]
     last_frame = len(step.frames) - 1
     if last_frame < 0:
-        odb_access.close()
         return False
 
     # Decide frames to export
     frames_to_export = []
     if RIKS_FRAME_POLICY == 'peakLPF':
-        peak_i, peak_lpf, peak_t, peak_type = find_peak_lpf_frame_index(odb_access, step_name)
+        peak_i, peak_lpf, peak_t, peak_type = find_peak_lpf_frame_index(odb_session, step_name)
         frames_to_export.append(('peakLPF', peak_i, peak_lpf, peak_t, peak_type))
         if EXPORT_RIKS_LAST_TOO:
             frames_to_export.append(('last', last_frame, None, None, None))
     else:
         frames_to_export.append(('last', last_frame, None, None, None))
 
-    vp = setup_export_viewport()
-    time.sleep(0.2)  # Wait for viewport to be ready
-    vp.setValues(displayedObject=odb_session)
-    time.sleep(0.3)  # Wait for displayedObject setup to complete
+    vp = _get_vp_for(odb_session, odb_path_abs)
+    odb_display = vp.odbDisplay  # Resolved once, used for every frame/variable change
 
-    vp.odbDisplay.display.setValues(plotState=(CONTOURS_ON_DEF,))
-    time.sleep(WAIT_AFTER_SETVIEW)
-    vp.odbDisplay.commonOptions.setValues(deformationScaling=UNIFORM,
-                                          uniformScaleFactor=float(scale),
-                                          visibleEdges=FEATURE)
-    time.sleep(WAIT_AFTER_SETVIEW)
+    odb_display.display.setValues(plotState=(CONTOURS_ON_DEF,))
+    odb_display.commonOptions.setValues(deformationScaling=UNIFORM,
+                                        uniformScaleFactor=float(scale),
+                                        visibleEdges=FEATURE)
 
     ok = True
     exported = 0
+    peeq_missing = []   # (tag, view) pairs without PEEQ, reported in one note file
+    peeq_error = None
+
+    # Variables exported per (frame, view): (file name part, variableLabel, position, refinement)
+    variables = [('stress_mises', 'S', INTEGRATION_POINT, (INVARIANT, 'Mises')),
+                 ('peeq', 'PEEQ', INTEGRATION_POINT, None)]
+    if EXPORT_RIKS_U1:  # Priority 2
+        variables.append(('U1', 'U', NODAL, (COMPONENT, 'U1')))
 
     for frame_info in frames_to_export:
         tag = frame_info[0]
@@ -648,8 +765,7 @@ def export_riks_images(odb_path, output_dir, views=None, scale=1.0):
             ok = False
             continue
         try:
-            vp.odbDisplay.setFrame(step=step_name, frame=fr_i)
-            time.sleep(WAIT_AFTER_SETFRAME)
+            odb_display.setFrame(step=step_name, frame=fr_i)
         except Exception as e:
             ok = False
             print("[riks] setFrame failed (%s): %s" % (tag, str(e)))
@@ -659,64 +775,47 @@ def export_riks_images(odb_path, output_dir, views=None, scale=1.0):
             peak_desc = "Peak before drop" if peak_type == 'peak_before_drop' else "Global max fallback"
             print("[riks] Using %s LPF frame=%d, peakLPF=%s, time=%s" % (peak_desc, fr_i, str(peak_lpf), str(peak_t)))
 
+        # Frame -> view -> variable: the view is fitted once per frame and reused by
+        # every variable (changing the contour variable does not change the extents)
         for v in views:
-            if not apply_view(vp, v):
+            if not apply_view(vp, v, (odb_path, step_name, fr_i, v)):
                 continue
 
-            # --- Stress Mises ---
-            try:
-                vp.odbDisplay.setPrimaryVariable(variableLabel='S', outputPosition=INTEGRATION_POINT,
-                                                 refinement=(INVARIANT, 'Mises'))
-                time.sleep(WAIT_AFTER_SETVAR)  # GUI mode: wait for variable setting and rendering
-                vp.view.fitView()
-                time.sleep(WAIT_AFTER_SETVIEW)
-                base = os.path.join(output_dir, "riks_stress_mises_%s_%s" % (tag, v))
-                if _export_with_legend(vp, base):
-                    exported += 1
-                else:
-                    ok = False
-            except Exception as e:
-                ok = False
-                print("[riks] Stress export exception (%s,%s): %s" % (tag, v, str(e)))
-
-            # --- PEEQ ---
-            try:
-                vp.odbDisplay.setPrimaryVariable(variableLabel='PEEQ', outputPosition=INTEGRATION_POINT)
-                time.sleep(WAIT_AFTER_SETVAR)  # GUI mode: wait for variable setting and rendering
-                vp.view.fitView()
-                time.sleep(WAIT_AFTER_SETVIEW)
-                base = os.path.join(output_dir, "riks_peeq_%s_%s" % (tag, v))
-                if _export_with_legend(vp, base):
-                    exported += 1
-                else:
-                    ok = False
-            except Exception as e:
-                note_path = os.path.join(output_dir, "riks_peeq_%s_%s_NOT_AVAILABLE.txt" % (tag, v))
-                try:
-                    with open(note_path, "w") as f:
-                        f.write("PEEQ not available.\nError: %s\n" % str(e))
-                except:
-                    pass
-                print("[riks] PEEQ not available (%s,%s). Wrote: %s" % (tag, v, note_path))
-
-            # --- U1 (Priority 2) ---
-            if EXPORT_RIKS_U1:
+            for name, var_label, position, refinement in variables:
+                base = os.path.join(output_dir, "riks_%s_%s_%s" % (name, tag, v))
                 try:
-                    vp.odbDisplay.setPrimaryVariable(variableLabel='U', outputPosition=NODAL,
-                                                     refinement=(COMPONENT, 'U1'))
-                    time.sleep(WAIT_AFTER_SETVAR)  # GUI mode: wait for variable setting and rendering
-                    vp.view.fitView()
-                    time.sleep(WAIT_AFTER_SETVIEW)
-                    base = os.path.join(output_dir, "riks_U1_%s_%s" % (tag, v))
+                    if refinement is None:
+                        odb_display.setPrimaryVariable(variableLabel=var_label, outputPosition=position)
+                    else:
+                        odb_display.setPrimaryVariable(variableLabel=var_label, outputPosition=position,
+                                                       refinement=refinement)
                     if _export_with_legend(vp, base):
                         exported += 1
                     else:
                         ok = False
                 except Exception as e:
-                    ok = False
-                    print("[riks] U1 export exception (%s,%s): %s" % (tag, v, str(e)))
+                    if var_label == 'PEEQ':
+                        # PEEQ is missing in purely elastic runs: note it instead of failing
+                        peeq_missing.append((tag, v))
+                        peeq_error = peeq_error or str(e)
+                        print("[riks] PEEQ not available (%s,%s)" % (tag, v))
+                    else:
+                        ok = False
+                        print("[riks] %s export exception (%s,%s): %s" % (name, tag, v, str(e)))
 
-    odb_access.close()
+    if peeq_missing:
+        # One note per case instead of one file create per (frame, view) on the NAS
+        note_path = os.path.join(output_dir, "riks_peeq_NOT_AVAILABLE.txt")
+        try:
+            with open(note_path, "w") as f:
+                f.write("PEEQ not available.\nError: %s\nMissing (frame, view):\n%s\n" %
+                        (peeq_error, "\n".join("%s %s" % tv for tv in peeq_missing)))
+            print("[riks] Wrote: %s" % note_path)
+        except:
+            pass
+
+    if not flush_pending_copies():
+        ok = False
     time.sleep(WAIT_BEFORE_CLOSE_SEC)
     
     # GUI mode: don't close session.odbs here, leave to main script for unified closing
@@ -727,6 +826,12 @@ def export_riks_images(odb_path, output_dir, views=None, scale=1.0):
 # -----------------------------
 # Command-line argument support (from single_case)
 # -----------------------------
+# Fallback argv parser: Abaqus launcher tokens that are never case arguments
+_ARG_SKIP_LITERALS = frozenset(('ON', 'OFF', 'viewer', 'cae', 'noGUI'))
+_ARG_SKIP_RE = re.compile(r'^-|^script=|\.exe$|SIMULIA|Abaqus|Temp.*AppData|AppData.*Temp')
+_ARG_ODB_RE = re.compile(r'\.odb$', re.I)
+_ARG_OUTDIR_RE = re.compile(r'results|output', re.I)
+
 def export_single_case_from_args():
     """Export images for a single case from command line arguments (integrated from single_case)"""
     import os as os_module  # Avoid variable name conflict
@@ -747,34 +852,19 @@ def export_single_case_from_args():
         output_dir = None
         n_modes_str = None
         
+        # 单次遍历：跳过空串、选项、Abaqus可执行文件/系统参数和临时目录
         for arg in args:
-            # 跳过空字符串
-            if not arg or arg.strip() == '':
-                continue
-            # 跳过以-开头的选项
-            if arg.startswith('-'):
-                continue
-            # 跳过Abaqus可执行文件和系统参数
-            if arg.endswith('.exe') or arg.startswith('script='):
-                continue
-            if arg in ('ON', 'OFF', 'viewer', 'cae', 'noGUI'):
-                continue
-            # Skip temporary directory paths
-            if 'Temp' in arg and 'AppData' in arg:
+            if not arg.strip() or arg in _ARG_SKIP_LITERALS or _ARG_SKIP_RE.search(arg):
                 continue
-            if 'SIMULIA' in arg or 'Abaqus' in arg:
-                continue
-            
             # Identify .odb files
-            if arg.endswith('.odb'):
+            if _ARG_ODB_RE.search(arg):
                 odb_paths.append(arg)
             # Identify numbers (n_modes)
             elif arg.isdigit():
                 n_modes_str = arg
-            # Identify output directory (contains results or output, or relative path)
-            elif 'results' in arg.lower() or 'output' in arg.lower() or 'LC' in arg:
-                if output_dir is None:
-                    output_dir = arg
+            # Identify output directory (contains results or output, or LC case name)
+            elif output_dir is None and ('LC' in arg or _ARG_OUTDIR_RE.search(arg)):
+                output_dir = arg
         
         # Build cmd_args: [buckle_odb, riks_odb, output_dir, n_modes]
         cmd_args = []
@@ -861,6 +951,8 @@ def export_single_case_from_args():
             f.write("Export completed at: %s\n" % time.strftime("%Y-%m-%d %H:%M:%S"))
             f.write("Buckling: %s\n" % ("OK" if buck_ok else "FAIL"))
             f.write("Riks: %s\n" % ("OK" if riks_ok else "FAIL"))
+            for path, reason in _FAILED_IMAGES:
+                f.write("Failed image: %s (%s)\n" % (path, reason))
     except:
         pass
     
@@ -870,6 +962,8 @@ def export_single_case_from_args():
     
     # Close all ODB files
     print("[main] Closing all ODB files...")
+    _release_viewports()  # Drop viewports before their ODBs go away
+    _remove_short_dir()
     try:
         odb_keys = list(session.odbs.keys())
         print("[main] Found %d open ODB files" % len(odb_keys))
@@ -879,6 +973,9 @@ def export_single_case_from_args():
                 print("[main] Closed ODB: %s" % str(key)[:80])
             except Exception as e:
                 print("[main] Error closing ODB: %s" % str(e))
+        _OPEN_ODBS.clear()
+        _VIEW_CACHE.clear()
+        _APPLIED_VIEW.clear()
         time.sleep(1.0)  # Wait for ODB closing to complete
     except Exception as e:
         print("[main] Error getting ODB list: %s" % str(e))
@@ -909,6 +1006,89 @@ def export_single_case_from_args():
 # -----------------------------
 # Auto-discovery main (批量模式)
 # -----------------------------
+def _visible_subdirs(path):
+    """[(name, full_path)] of non-hidden subdirectories, one readdir pass."""
+    if scandir is None:
+        return [(d, os.path.join(path, d)) for d in os.listdir(path)
+                if not d.startswith(".") and os.path.isdir(os.path.join(path, d))]
+    # DirEntry carries the file type from readdir, so no stat per entry
+    return [(e.name, e.path) for e in scandir(path)
+            if not e.name.startswith(".") and e.is_dir(follow_symlinks=False)]
+
+# stat results of candidate ODB paths (None = missing); discovery is read-only,
+# so entries are never invalidated
+_STAT_CACHE = {}
+
+def _cached_exists(path):
+    """os.path.exists with a positive/negative cache: one stat per path per run."""
+    try:
+        st = _STAT_CACHE[path]
+    except KeyError:
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        _STAT_CACHE[path] = st
+    return st is not None
+
+def _read_done_flag(case_path):
+    """(buckling_ok, riks_ok) from the _EXPORT_DONE.txt written by single-case mode."""
+    try:
+        with open(os.path.join(case_path, '_EXPORT_DONE.txt')) as f:
+            text = f.read()
+    except (IOError, OSError):
+        return (False, False)
+    return ('Buckling: OK' in text, 'Riks: OK' in text)
+
+def export_cases_parallel(cases, max_parallel=MAX_PARALLEL_EXPORTS):
+    """
+    Export independent cases in parallel viewer processes (single-case mode of this script).
+
+    cases: [(case_path, buckle_odb, riks_odb), ...]
+    Returns dict: case_path -> (buckling_ok, riks_ok), only for cases whose child
+    wrote _EXPORT_DONE.txt; the caller exports the others in-process (e.g. when
+    the "abaqus" launcher is missing from PATH or named differently)
+    """
+    script = os.path.join(WORK_DIR, 'export_images.py')
+    n_parallel = max(1, min(max_parallel, len(cases)))
+    pending = list(cases)
+    running = []
+    results = {}
+
+    while pending or running:
+        while pending and len(running) < n_parallel:
+            case_path, buckle_odb, riks_odb = pending.pop(0)
+            _ensure_dir(case_path)
+            try:
+                os.remove(os.path.join(case_path, '_EXPORT_DONE.txt'))  # No stale result
+            except OSError:
+                pass
+            cmd_str = 'abaqus viewer noGUI="%s" -- "%s" "%s" "%s" 1' % (
+                script, buckle_odb, riks_odb, case_path)
+            print("[parallel] Launching: %s" % cmd_str)
+            log = open(os.path.join(case_path, 'export_images_viewer.log'), 'w')
+            # shell=True so Windows finds the abaqus command through PATH
+            proc = subprocess.Popen(cmd_str, cwd=WORK_DIR, stdout=log,
+                                    stderr=subprocess.STDOUT, shell=True)
+            running.append((case_path, proc, log))
+
+        still_running = []
+        for case_path, proc, log in running:
+            if proc.poll() is None:
+                still_running.append((case_path, proc, log))
+            else:
+                log.close()
+                print("[parallel] %s finished (exit code %s)" % (case_path, proc.returncode))
+                if os.path.exists(os.path.join(case_path, '_EXPORT_DONE.txt')):
+                    results[case_path] = _read_done_flag(case_path)
+                else:
+                    print("[parallel] No _EXPORT_DONE.txt, will retry in-process: %s" % case_path)
+        running = still_running
+        if running:
+            time.sleep(EXPORT_POLL_SEC)
+
+    return results
+
 def find_and_export_all_images():
     log_file_path = os.path.join(OUTPUT_DIR, "export_images_log.txt")
     _ensure_dir(OUTPUT_DIR)
@@ -927,19 +1107,14 @@ def find_and_export_all_images():
             print("[main] OUTPUT_DIR not found: %s" % OUTPUT_DIR)
             return
 
-        model_dirs = [d for d in os.listdir(OUTPUT_DIR)
-                      if os.path.isdir(os.path.join(OUTPUT_DIR, d)) and not d.startswith(".")]
+        model_dirs = _visible_subdirs(OUTPUT_DIR)
 
         buck_ok = 0
         riks_ok = 0
+        cases = []
 
-        for model_name in model_dirs:
-            model_path = os.path.join(OUTPUT_DIR, model_name)
-            case_dirs = [d for d in os.listdir(model_path)
-                         if os.path.isdir(os.path.join(model_path, d)) and not d.startswith(".")]
-
-            for case_name in case_dirs:
-                case_path = os.path.join(model_path, case_name)
+        for model_name, model_path in model_dirs:
+            for case_name, case_path in _visible_subdirs(model_path):
 
                 # 查找ODB文件（支持新的简化目录结构）
                 short_case_dir = model_name + '_' + case_name
@@ -947,35 +1122,54 @@ def find_and_export_all_images():
                 riks_odb   = os.path.join(TEMP_DIR, short_case_dir, "Job_Riks_%s_%s.odb" % (model_name, case_name))
                 
                 # 如果新路径不存在，尝试旧路径
-                if not os.path.exists(buckle_odb):
+                if not _cached_exists(buckle_odb):
                     buckle_odb = os.path.join(TEMP_DIR, "Job_Buckle_%s_%s.odb" % (model_name, case_name))
-                if not os.path.exists(riks_odb):
+                if not _cached_exists(riks_odb):
                     riks_odb = os.path.join(TEMP_DIR, "Job_Riks_%s_%s.odb" % (model_name, case_name))
 
                 log.write("Model=%s Case=%s\n" % (model_name, case_name))
                 log.write("  BuckleODB=%s\n" % buckle_odb)
-                log.write("  RiksODB  =%s\n" % riks_odb)
-
-                ok_b = False
-                ok_r = False
-
-                if os.path.exists(buckle_odb):
+                log.write("  RiksODB  =%s\n\n" % riks_odb)
+                cases.append((model_name, case_name, case_path, buckle_odb, riks_odb))
+
+        # 各算例互相独立：并行时每个算例在单独的viewer进程中导出
+        # (只并行两个ODB都存在的算例；viewer吞掉'--'时单ODB参数会被误判为Buckle)
+        parallel_results = {}
+        runnable = [(c[2], c[3], c[4]) for c in cases
+                    if _cached_exists(c[3]) and _cached_exists(c[4])]
+        if MAX_PARALLEL_EXPORTS > 1 and len(runnable) > 1:
+            print("\n[main] Exporting %d case(s), %d in parallel" % (len(runnable), MAX_PARALLEL_EXPORTS))
+            parallel_results = export_cases_parallel(runnable)
+
+        for model_name, case_name, case_path, buckle_odb, riks_odb in cases:
+            ok_b = False
+            ok_r = False
+
+            if case_path in parallel_results:
+                ok_b, ok_r = parallel_results[case_path]
+            else:
+                if _cached_exists(buckle_odb):
                     print("\n[main] Buckling export: %s / %s" % (model_name, case_name))
                     ok_b = export_buckling_images(buckle_odb, case_path, n_modes=1,
                                                   views=['WebFront','Side','Iso'], scale=80.0)
-                    if ok_b: buck_ok += 1
                 else:
                     print("[main] Buckle ODB missing, skip: %s" % buckle_odb)
 
-                if os.path.exists(riks_odb):
+                if _cached_exists(riks_odb):
                     print("\n[main] Riks export: %s / %s" % (model_name, case_name))
                     ok_r = export_riks_images(riks_odb, case_path, views=['WebFront','Side','Iso'], scale=1.0)
-                    if ok_r: riks_ok += 1
                 else:
                     print("[main] Riks ODB missing, skip: %s" % riks_odb)
+                # Sequential batch: free this case's viewports and ODBs
+                _close_case_odbs([buckle_odb, riks_odb])
 
-                log.write("  Buckling=%s\n" % ("OK" if ok_b else "FAIL/SKIP"))
-                log.write("  Riks=%s\n\n" % ("OK" if ok_r else "FAIL/SKIP"))
+            if ok_b: buck_ok += 1
+            if ok_r: riks_ok += 1
+            log.write("Model=%s Case=%s: Buckling=%s, Riks=%s\n" % (
+                model_name, case_name, "OK" if ok_b else "FAIL/SKIP", "OK" if ok_r else "FAIL/SKIP"))
+            for path, reason in _FAILED_IMAGES:
+                log.write("  Failed image: %s (%s)\n" % (path, reason))
+            del _FAILED_IMAGES[:]
 
         # 格式化summary（使用.format()，兼容Python 2.7）
         summary = "\n{sep}\nSUMMARY\n  Buckling OK: {b}\n  Riks OK    : {r}\n  Log        : {p}\n{sep}\n".format(
@@ -983,6 +1177,7 @@ def find_and_export_all_images():
         )
         print(summary)
         log.write(summary)
+    _remove_short_dir()
 
 if __name__ == "__main__":
     # 调试：打印所有参数
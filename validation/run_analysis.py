@@ -39,6 +39,7 @@ from driverUtils import executeOnCaeStartup
 executeOnCaeStartup()
 
 import os
+import sys
 import csv
 import re
 import time
@@ -64,6 +65,11 @@ if not WORK_DIR or not os.path.exists(WORK_DIR):
 
 os.chdir(WORK_DIR)
 
+# abaqus cae noGUI不会把脚本目录加入sys.path，同目录的辅助模块需手动加入
+if WORK_DIR not in sys.path:
+    sys.path.insert(0, WORK_DIR)
+import cleanup
+
 # 重构后的目录结构（临时工作区 + 永久结果区）
 WORK_ROOT = os.path.join(WORK_DIR, 'work')      # 临时计算区，跑完就删（ODB/INP/DAT/MSG等）
 RESULTS_ROOT = os.path.join(WORK_DIR, 'results') # 最终保留（CSV + PNG）
@@ -77,6 +83,17 @@ CASE_WORK_DIR = WORK_ROOT  # 使用WORK_ROOT作为case工作目录
 # 配置选项
 KEEP_WORK_FILES = True  # 保留工作文件（ODB/INP/DAT/MSG等）用于检查
 SAVE_CAE = False  # 不保存CAE文件
+MAX_PARALLEL_CASES = 2  # 同时求解的工况数（各工况独立工作目录，互不干扰）
+JOB_POLL_SEC = 10  # 并行求解时的状态轮询间隔（秒）
+
+# 主机CPU探测与code/中的分析脚本共用solver_resources（物理核：psutil →
+# /proc/cpuinfo → 逻辑核的一半）；超线程对Abaqus无收益
+sys.path.append(os.path.join(os.path.dirname(WORK_DIR), 'code'))
+from solver_resources import physical_core_count
+CPU_COUNT = physical_core_count()
+# 并行求解时每个job的默认资源（写入job定义，run_jobs_parallel按job定义启动）
+JOB_CPUS = max(1, CPU_COUNT // MAX_PARALLEL_CASES)
+JOB_MEMORY = max(1, 90 // MAX_PARALLEL_CASES)
 
 # 创建必要的目录
 def _ensure_dir(path):
@@ -690,7 +707,7 @@ def apply_end_bcs(model, p, case_info):
     
     # 确保顶部轴向位移（U3）不被约束（用于剪切分析）
     # 对于剪切工况，顶部U3应该自由，允许轴向变形
-        dof_top['u3'] = UNSET
+    dof_top['u3'] = UNSET
     
     # 轴压工况也需要释放U3（已在上面处理）
     # if case_info.get('hasAxial') or 'Axial' in case_info['name']:
@@ -731,8 +748,8 @@ def insert_keyword_smart(model, anchor_text, new_content, position='after'):
 # =============================================================================
 # 弹性屈曲分析
 # =============================================================================
-def run_buckling_analysis(p, model_name, case_info, geo_info, case_work_dir=None, case_results_dir=None):
-    """运行弹性屈曲分析"""
+def run_buckling_analysis(p, model_name, case_info, geo_info, case_work_dir=None, case_results_dir=None, submit=True):
+    """运行弹性屈曲分析（submit=False时只写出inp，由run_jobs_parallel求解）"""
     case_name = case_info['name']
     print("\n" + "="*70)
     print("Buckling: %s - %s" % (model_name, case_name))
@@ -802,18 +819,38 @@ def run_buckling_analysis(p, model_name, case_info, geo_info, case_work_dir=None
         os.chdir(case_work_dir)
         print("[run_buckling_analysis] Changed to work dir: %s" % os.getcwd())
         
+        # 单独提交时独占整机；并行求解时按JOB_CPUS/JOB_MEMORY分配
+        cpus = CPU_COUNT if submit else JOB_CPUS
         mdb.Job(name=job_name, model=buckle_model_name, type=ANALYSIS,
-                description='Buckling', memory=90, memoryUnits=PERCENTAGE,
+                description='Buckling', memory=90 if submit else JOB_MEMORY,
+                memoryUnits=PERCENTAGE,
                 explicitPrecision=SINGLE, nodalOutputPrecision=SINGLE,
                 echoPrint=OFF, modelPrint=OFF, contactPrint=OFF, historyPrint=OFF,
-                resultsFormat=ODB, numCpus=1, numGPUs=0)
+                resultsFormat=ODB, multiprocessingMode=THREADS,
+                numCpus=cpus, numDomains=cpus, numGPUs=0)
         
-        mdb.jobs[job_name].submit(consistencyChecking=OFF)
-        mdb.jobs[job_name].waitForCompletion()
+        if submit:
+            mdb.jobs[job_name].submit(consistencyChecking=OFF)
+            mdb.jobs[job_name].waitForCompletion()
+        else:
+            mdb.jobs[job_name].writeInput(consistencyChecking=OFF)
     finally:
         os.chdir(original_cwd)
         print("[run_buckling_analysis] Returned to original dir: %s" % os.getcwd())
     
+    # 保存CAE（仅在需要时）
+    if SAVE_CAE:
+        try:
+            mdb.saveAs(pathName=os.path.join(case_work_dir, buckle_model_name + '.cae'))
+        except:
+            pass
+    
+    if submit:
+        finish_buckling_analysis(job_name, geo_info, case_work_dir, case_results_dir)
+    return job_name
+
+def finish_buckling_analysis(job_name, geo_info, case_work_dir, case_results_dir):
+    """屈曲job完成后提取结果"""
     # 提取结果（保存到results目录）
     _ensure_dir(case_results_dir)
     
@@ -826,15 +863,6 @@ def run_buckling_analysis(p, model_name, case_info, geo_info, case_work_dir=None
     else:
         print("[WARN] ODB not found for job: %s" % job_name)
         print("[WARN] Expected path: %s (exists: %s)" % (odb_path, os.path.exists(odb_path)))
-    
-    # 保存CAE（仅在需要时）
-    if SAVE_CAE:
-        try:
-            mdb.saveAs(pathName=os.path.join(case_work_dir, buckle_model_name + '.cae'))
-        except:
-            pass
-    
-    return job_name
 
 def extract_buckling_results(odb_path, output_dir, geo_info):
     """
@@ -998,8 +1026,8 @@ def extract_buckling_results(odb_path, output_dir, geo_info):
 # =============================================================================
 # 弹塑性Riks分析
 # =============================================================================
-def run_riks_analysis(p, model_name, case_info, geo_info, buckle_job_name, case_work_dir=None, case_results_dir=None):
-    """运行弹塑性Riks分析"""
+def run_riks_analysis(p, model_name, case_info, geo_info, buckle_job_name, case_work_dir=None, case_results_dir=None, submit=True):
+    """运行弹塑性Riks分析（submit=False时只写出inp，由run_jobs_parallel求解）"""
     case_name = case_info['name']
     print("\n" + "="*70)
     print("Riks: %s - %s" % (model_name, case_name))
@@ -1105,19 +1133,34 @@ def run_riks_analysis(p, model_name, case_info, geo_info, buckle_job_name, case_
         print("[run_riks_analysis] Changed to work dir: %s" % os.getcwd())
         
         mdb.Job(name=job_name, model=riks_model_name, type=ANALYSIS,
-                description='Riks', memory=90, memoryUnits=PERCENTAGE,
+                description='Riks', memory=90 if submit else JOB_MEMORY,
+                memoryUnits=PERCENTAGE,
                 explicitPrecision=SINGLE, nodalOutputPrecision=SINGLE,
                 echoPrint=OFF, modelPrint=OFF, contactPrint=OFF, historyPrint=OFF,
                 resultsFormat=ODB, multiprocessingMode=THREADS,
                 numCpus=int(p['numCpus']), numDomains=int(p['numCpus']), numGPUs=0)
         
         mdb.jobs[job_name].writeInput(consistencyChecking=OFF)
-        mdb.jobs[job_name].submit(consistencyChecking=OFF)
-        mdb.jobs[job_name].waitForCompletion()
+        if submit:
+            mdb.jobs[job_name].submit(consistencyChecking=OFF)
+            mdb.jobs[job_name].waitForCompletion()
     finally:
         os.chdir(original_cwd)
         print("[run_riks_analysis] Returned to original dir: %s" % os.getcwd())
     
+    # 保存CAE（仅在需要时）
+    if SAVE_CAE:
+        try:
+            mdb.saveAs(pathName=os.path.join(case_work_dir, riks_model_name + '.cae'))
+        except:
+            pass
+    
+    if submit:
+        return finish_riks_analysis(job_name, geo_info, case_info, case_work_dir, case_results_dir)
+    return job_name
+
+def finish_riks_analysis(job_name, geo_info, case_info, case_work_dir, case_results_dir):
+    """Riks job完成后提取结果"""
     # 提取结果（保存到results目录）
     _ensure_dir(case_results_dir)
     
@@ -1132,13 +1175,6 @@ def run_riks_analysis(p, model_name, case_info, geo_info, buckle_job_name, case_
         print("[WARN] Expected path: %s (exists: %s)" % (odb_path, os.path.exists(odb_path)))
         results = {'case': case_info['name'], 'max_U': 0, 'max_RF': 0, 'max_LPF': 0}
     
-    # 保存CAE（仅在需要时）
-    if SAVE_CAE:
-        try:
-            mdb.saveAs(pathName=os.path.join(case_work_dir, riks_model_name + '.cae'))
-        except:
-            pass
-    
     return results
 
 def extract_riks_results(odb_path, output_dir, geo_info, case_info):
@@ -1418,6 +1454,59 @@ def export_case_images(buckle_odb_path, riks_odb_path, output_dir, model_name, c
     return success
 
 
+# =============================================================================
+# 并行求解
+# =============================================================================
+def run_jobs_parallel(jobs, max_parallel=MAX_PARALLEL_CASES):
+    """
+    并行求解已写出inp的job（各工况互相独立，每个job在自己的工作目录中运行）
+    
+    每个job按其mdb.Job定义中的numCpus/memory启动；同时运行的job数不超过
+    max_parallel，且占用核数之和不超过CPU_COUNT（单个job超出时独占运行）
+    
+    参数:
+        jobs: [(job_name, case_work_dir), ...]
+        max_parallel: 同时运行的job数上限
+    
+    返回:
+        dict: job_name -> 求解器退出码
+    """
+    pending = list(jobs)
+    running = []
+    exit_codes = {}
+    
+    while pending or running:
+        # 补满空闲槽位
+        while pending and len(running) < max_parallel:
+            job = mdb.jobs[pending[0][0]]
+            busy = sum(r[3] for r in running)
+            if running and busy + job.numCpus > CPU_COUNT:
+                break
+            job_name, work_dir = pending.pop(0)
+            cmd_str = 'abaqus job=%s cpus=%d mp_mode=threads memory="%d %%" interactive' % (
+                job_name, job.numCpus, job.memory)
+            print("[run_jobs_parallel] Launching in %s: %s" % (work_dir, cmd_str))
+            log = open(os.path.join(work_dir, job_name + '.log'), 'w')
+            # 使用shell=True让Windows通过PATH找到abaqus命令
+            proc = subprocess.Popen(cmd_str, cwd=work_dir, stdout=log,
+                                    stderr=subprocess.STDOUT, shell=True)
+            running.append((job_name, proc, log, job.numCpus))
+        
+        still_running = []
+        for job_name, proc, log, cpus in running:
+            if proc.poll() is None:
+                still_running.append((job_name, proc, log, cpus))
+            else:
+                log.close()
+                exit_codes[job_name] = proc.returncode
+                print("[run_jobs_parallel] %s finished (exit code %s)" % (job_name, proc.returncode))
+        running = still_running
+        if running:
+            time.sleep(JOB_POLL_SEC)
+    
+    return exit_codes
+
+
 # =============================================================================
 # 主流程
 # =============================================================================
@@ -1440,30 +1529,94 @@ def run_multicase_analysis(p):
     
     all_results = []
     
+    # 新目录结构：work/{model}/{case}/ (临时工作区) 和 results/{model}/{case}/ (永久结果区)
+    case_dirs = {}
     for case_info in cases:
         case_name = case_info['name']
-        # 新目录结构：work/{model}/{case}/ (临时工作区) 和 results/{model}/{case}/ (永久结果区)
         case_work_dir = os.path.join(WORK_ROOT, model_name, case_name)
         case_results_dir = os.path.join(RESULTS_ROOT, model_name, case_name)
         _ensure_dir(case_work_dir)
         _ensure_dir(case_results_dir)
+        case_dirs[case_name] = (case_work_dir, case_results_dir)
+    
+    failed_cases = {}  # case_name -> 失败原因
+    
+    def _case_failed(case_name, e):
+        failed_cases[case_name] = str(e)
+        print("Error in case %s: %s" % (case_name, str(e)))
+        import traceback
+        traceback.print_exc()
+    
+    def _solve_failed(case_name, job_name, exit_codes):
+        """求解器退出码非0（或未运行）时记录失败，返回True"""
+        code = exit_codes.get(job_name)
+        if code == 0:
+            return False
+        failed_cases[case_name] = "job %s exited with code %s" % (job_name, code)
+        print("[main] ERROR: case %s: %s" % (case_name, failed_cases[case_name]))
+        return True
+    
+    # 第1阶段：所有工况的弹性屈曲（先写inp，再并行求解）
+    buckle_jobs = {}
+    for case_info in cases:
+        case_name = case_info['name']
+        case_work_dir, case_results_dir = case_dirs[case_name]
+        try:
+            buckle_jobs[case_name] = run_buckling_analysis(
+                p, model_name, case_info, geo_info, case_work_dir, case_results_dir, submit=False)
+        except Exception as e:
+            _case_failed(case_name, e)
+    exit_codes = run_jobs_parallel([(job_name, case_dirs[case_name][0])
+                                    for case_name, job_name in buckle_jobs.items()])
+    buckle_done = {}
+    for case_name, job_name in buckle_jobs.items():
+        if _solve_failed(case_name, job_name, exit_codes):
+            continue
+        case_work_dir, case_results_dir = case_dirs[case_name]
+        try:
+            # CSV直接保存到results目录
+            finish_buckling_analysis(job_name, geo_info, case_work_dir, case_results_dir)
+            buckle_done[case_name] = job_name
+        except Exception as e:
+            _case_failed(case_name, e)
+    
+    # 第2阶段：弹塑性Riks（需要屈曲结果作为初始缺陷，屈曲失败的工况跳过）
+    riks_jobs = {}
+    for case_info in cases:
+        case_name = case_info['name']
+        if case_name not in buckle_done:
+            continue
+        case_work_dir, case_results_dir = case_dirs[case_name]
+        try:
+            riks_jobs[case_name] = run_riks_analysis(
+                p, model_name, case_info, geo_info, buckle_jobs[case_name],
+                case_work_dir, case_results_dir, submit=False)
+        except Exception as e:
+            _case_failed(case_name, e)
+    exit_codes = run_jobs_parallel([(job_name, case_dirs[case_name][0])
+                                    for case_name, job_name in riks_jobs.items()])
+    
+    # 第3阶段：逐个工况提取Riks结果、导出图像（Viewer需串行）、清理
+    cleanup_dirs = []
+    for case_info in cases:
+        case_name = case_info['name']
+        if case_name not in riks_jobs:
+            continue
+        if _solve_failed(case_name, riks_jobs[case_name], exit_codes):
+            continue
+        case_work_dir, case_results_dir = case_dirs[case_name]
         
         try:
-            # 弹性屈曲（CSV直接保存到results目录）
-            buckle_job = run_buckling_analysis(p, model_name, case_info, geo_info, case_work_dir, case_results_dir)
-            # 查找buckling ODB（实际位置：case_work_dir即temp_process/{model}/{case}/）
-            buckle_job_name = 'Job_Buckle_' + model_name + '_' + case_name
-            buckle_odb_path = os.path.join(case_work_dir, buckle_job_name + '.odb')
+            riks_results = finish_riks_analysis(riks_jobs[case_name], geo_info, case_info,
+                                                case_work_dir, case_results_dir)
+            all_results.append(riks_results)
+            
+            # 查找ODB（实际位置：case_work_dir即work/{model}/{case}/）
+            buckle_odb_path = os.path.join(case_work_dir, buckle_jobs[case_name] + '.odb')
             if not os.path.exists(buckle_odb_path):
                 print("[main] WARNING: Buckling ODB not found: %s" % buckle_odb_path)
                 buckle_odb_path = None
-            
-            # 弹塑性Riks（CSV直接保存到results目录）
-            riks_results = run_riks_analysis(p, model_name, case_info, geo_info, buckle_job, case_work_dir, case_results_dir)
-            all_results.append(riks_results)
-            # 查找riks ODB（实际位置：case_work_dir即work/{model}/{case}/）
-            riks_job_name = 'Job_Riks_' + model_name + '_' + case_name
-            riks_odb_path = os.path.join(case_work_dir, riks_job_name + '.odb')
+            riks_odb_path = os.path.join(case_work_dir, riks_jobs[case_name] + '.odb')
             if not os.path.exists(riks_odb_path):
                 print("[main] WARNING: Riks ODB not found: %s" % riks_odb_path)
                 riks_odb_path = None
@@ -1472,26 +1625,33 @@ def run_multicase_analysis(p):
             print("\n[main] Exporting images for case: %s / %s" % (model_name, case_name))
             export_case_images(buckle_odb_path, riks_odb_path, case_results_dir, model_name, case_name)
             
-            # 清理工作目录（仅在成功时）
+            # 结果验证通过的工作目录留到最后统一删除（仅在成功时）
             if not KEEP_WORK_FILES:
                 try:
-                    import cleanup_helper
-                    cleanup_helper.cleanup_case_work_dir(case_work_dir, case_results_dir, min_png_count=1, keep_work_files=KEEP_WORK_FILES)
+                    if cleanup.cleanup_case_work_dir(case_work_dir, case_results_dir, min_png_count=1,
+                                                     keep_work_files=KEEP_WORK_FILES, remove=False):
+                        cleanup_dirs.append(case_work_dir)
                 except Exception as e:
                     print("[main] WARNING: Cleanup failed: %s" % str(e))
             
         except Exception as e:
-            print("Error in case %s: %s" % (case_name, str(e)))
-            import traceback
-            traceback.print_exc()
+            _case_failed(case_name, e)
             continue
     
+    # 并行删除所有可清理的工作目录（无目录可删时也写出缓存的清理日志）
+    cleanup.remove_work_dirs(cleanup_dirs)
+    
+    if failed_cases:
+        print("\n[main] %d case(s) failed for %s:" % (len(failed_cases), model_name))
+        for case_name in sorted(failed_cases):
+            print("  %s: %s" % (case_name, failed_cases[case_name]))
+    
     # 写summary
-    write_summary(model_name, all_results, geo_info, p)
+    write_summary(model_name, all_results, geo_info, p, failed_cases)
     
     return all_results
 
-def write_summary(model_name, results, geo_info, p):
+def write_summary(model_name, results, geo_info, p, failed_cases=None):
     """写汇总文件（保存到results目录）"""
     summary_path = os.path.join(RESULTS_ROOT, model_name, 'summary.txt')
     _ensure_dir(os.path.dirname(summary_path))
@@ -1547,6 +1707,12 @@ def write_summary(model_name, results, geo_info, p):
             ))
         
         f.write("-"*70 + "\n")
+        
+        if failed_cases:
+            f.write("\nFailed Cases:\n")
+            for case_name in sorted(failed_cases):
+                f.write("  %s: %s\n" % (case_name, failed_cases[case_name]))
+        
         f.write("\nAnalysis completed at: %s\n" % time.strftime("%Y-%m-%d %H:%M:%S"))
 
 